@@ -0,0 +1,89 @@
+import logging
+import os
+import threading
+import time
+
+from cifsdk.exceptions import CircuitOpen
+
+THRESHOLD = os.getenv('CIFSDK_CLIENT_CIRCUIT_THRESHOLD', 5)
+RESET_TIMEOUT = os.getenv('CIFSDK_CLIENT_CIRCUIT_RESET_TIMEOUT', 30)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker(object):
+    """
+    Client side circuit breaker.
+
+    closed: calls go through, `threshold` consecutive failures trip the breaker
+    open: calls fail fast with CircuitOpen until `reset_timeout` seconds have passed
+    half-open: a single trial call is let through, success closes the breaker, failure re-opens it
+    """
+
+    def __init__(self, threshold=THRESHOLD, reset_timeout=RESET_TIMEOUT, clock=time.time):
+        self.threshold = int(threshold)
+        self.reset_timeout = float(reset_timeout)
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and (self.clock() - self._opened_at) >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._trial = False
+
+            return self._state
+
+    def allow(self):
+        """
+        :raises CircuitOpen: if the call should not be attempted
+        """
+        state = self.state
+        with self._lock:
+            if state == OPEN:
+                raise CircuitOpen()
+
+            if state == HALF_OPEN:
+                if self._trial:
+                    raise CircuitOpen()
+
+                self._trial = True
+
+    def success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info('circuit closed')
+
+            self._state = CLOSED
+            self._failures = 0
+            self._trial = False
+
+    def release(self):
+        """
+        The call was abandoned (cancelled, interrupted, ..) before the backend had a say, give up the half-open
+        trial slot without counting it either way so the next call can try
+        """
+        with self._lock:
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+
+            if self._state == HALF_OPEN or self._failures >= self.threshold:
+                if self._state != OPEN:
+                    logger.warning('circuit open after %i consecutive failures' % self._failures)
+
+                self._state = OPEN
+                self._opened_at = self.clock()
+                self._trial = False
@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from cifsdk.client.plugin import filters_key
+
+CACHE_SIZE = os.getenv('CIFSDK_CLIENT_CACHE_SIZE', 10000)
+CACHE_TTL = os.getenv('CIFSDK_CLIENT_CACHE_TTL', 300)
+CACHE_NEGATIVE_TTL = os.getenv('CIFSDK_CLIENT_CACHE_NEGATIVE_TTL', 60)
+
+logger = logging.getLogger(__name__)
+
+
+class CachedClient(object):
+    """
+    Memoising wrapper around any client plugin (HTTP, ZMQ, ..). indicators_search results are kept in a bounded
+    LRU for `ttl` seconds, empty results for `negative_ttl` seconds (0 disables negative caching). Everything
+    else is passed through to the wrapped client.
+
+        cli = CachedClient(HTTP(remote, token), maxsize=50000, ttl=600)
+
+    Cached results are shared between callers, treat them as read-only.
+    """
+
+    def __init__(self, client, maxsize=CACHE_SIZE, ttl=CACHE_TTL, negative_ttl=CACHE_NEGATIVE_TTL, clock=time.time):
+        self.client = client
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.negative_ttl = float(negative_ttl)
+        self.clock = clock
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def search(self, filters):
+        return self.indicators_search(filters)
+
+    def _get(self, k):
+        """
+        :return: (True, cached result) or (False, None)
+        """
+        with self._lock:
+            e = self._cache.get(k)
+            if e is not None:
+                if e[0] > self.clock():
+                    self._cache.move_to_end(k)
+                    self.hits += 1
+                    if not e[1]:
+                        self.negative_hits += 1
+
+                    return True, e[1]
+
+                del self._cache[k]
+
+            self.misses += 1
+            return False, None
+
+    def _set(self, k, rv):
+        ttl = self.ttl if rv else self.negative_ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._cache[k] = (self.clock() + ttl, rv)
+            self._cache.move_to_end(k)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def indicators_search(self, filters, **kwargs):
+        if kwargs:
+            return self.client.indicators_search(filters, **kwargs)
+
+        k = filters_key(filters)
+
+        hit, rv = self._get(k)
+        if hit:
+            return rv
+
+        rv = self.client.indicators_search(filters)
+        self._set(k, rv)
+        return rv
+
+    def indicators_search_many(self, indicators, **filters):
+        """
+        Same as the wrapped client's indicators_search_many, cached hits are answered locally and only the misses
+        are sent on (in a single bulk call)
+        """
+        # transport options, not filters
+        opts = {k: filters.pop(k) for k in ['workers', 'window'] if k in filters}
+
+        rv = {}
+        keys = {}
+        for i in OrderedDict.fromkeys(indicators):
+            f = dict(filters)
+            f['indicator'] = i
+            keys[i] = filters_key(f)
+
+            hit, r = self._get(keys[i])
+            if hit:
+                rv[i] = r
+
+        misses = [i for i in keys if i not in rv]
+        if misses:
+            for i, r in self.client.indicators_search_many(misses, **dict(filters, **opts)).items():
+                self._set(keys[i], r)
+                rv[i] = r
+
+        return rv
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'size': len(self._cache),
+                'maxsize': self.maxsize,
+            }
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 
+import json
 import logging
 import os.path
 import select
+import sys
 import textwrap
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
@@ -13,12 +15,96 @@ from cifsdk.constants import CONFIG_PATH, REMOTE_ADDR, TOKEN, SEARCH_LIMIT, FORM
 from cifsdk.exceptions import AuthError
 from csirtg_indicator.format import FORMATS
 from cifsdk.utils import setup_logging, get_argument_parser, read_config
+from cifsdk.utils.zjson import default
 from csirtg_indicator import Indicator
 from pprint import pprint
 import arrow
 
 logger = logging.getLogger(__name__)
 
+# feed exports built by the sdk itself rather than csirtg_indicator's formatters
+EXPORT_FORMATS = ['bloom', 'parquet', 'arrow-ipc', 'ndjson']
+
+
+def _feed_iter(cli, filters):
+    if hasattr(cli, 'feed_iter'):
+        return cli.feed_iter(filters)
+
+    return cli.feed(filters=filters)
+
+
+def _write(data, path=None):
+    if isinstance(data, str):
+        if not path:
+            print(data)
+            return
+
+        data = (data + '\n').encode('utf-8')
+
+    if not path:
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return
+
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def export_feed(cli, filters, format, output=None, error_rate=None, flush_every=0):
+    """
+    Pull a feed and write it out in one of the EXPORT_FORMATS
+
+    :param cli: client
+    :param filters: feed filters
+    :param format: export format, eg: bloom, parquet, arrow-ipc, ndjson
+    :param output: path to write to, defaults to stdout
+    :param error_rate: false positive rate for bloom filters
+    :param flush_every: for ndjson, flush the output after this many indicators (0 when the buffer fills)
+    """
+    if format == 'bloom':
+        from cifsdk.match.bloom import BloomFilter, ERROR_RATE
+        b = BloomFilter.from_indicators(_feed_iter(cli, filters), error_rate=error_rate or ERROR_RATE)
+        _write(b.to_bytes(), output)
+        return
+
+    if format in ['parquet', 'arrow-ipc']:
+        from cifsdk.feed.export import write_parquet, write_arrow_ipc
+        w = write_parquet if format == 'parquet' else write_arrow_ipc
+        w(_feed_iter(cli, filters), output or sys.stdout.buffer)
+        return
+
+    if format == 'ndjson':
+        from cifsdk.feed.export import write_ndjson
+        write_ndjson(_feed_iter(cli, filters), output or sys.stdout, flush_every=flush_every)
+        return
+
+    raise ValueError('unsupported export format: %s' % format)
+
+
+def diff_feed(cli, filters, snapshot, output=None):
+    """
+    Pull a feed, write what changed since the last pull stored in `snapshot` as json lines
+    ({"action": "added|removed|changed", "data": {..}}) and update the snapshot
+
+    :return: number of changes written
+    """
+    from cifsdk.feed.diff import diff_feed as _diff_feed
+
+    f = open(output, 'w') if output else sys.stdout
+    n = 0
+    try:
+        for action, i in _diff_feed(_feed_iter(cli, filters), snapshot):
+            f.write(json.dumps({'action': action, 'data': i}, default=default) + '\n')
+            n += 1
+    finally:
+        if output:
+            f.close()
+        else:
+            f.flush()
+
+    logger.info('%i changes since the last snapshot' % n)
+    return n
+
 # argparse keyvalue class
 # https://www.geeksforgeeks.org/python-key-value-pair-using-argparse/
 class KeyValueParser(argparse_action):
@@ -80,7 +166,11 @@ def main():
     p.add_argument('--limit', help='limit results [default %(default)s]', default=SEARCH_LIMIT)
     p.add_argument('--reporttime', help='specify reporttime filter')
     p.add_argument('-n', '--nolog', help='do not log search', action='store_true')
-    p.add_argument('-f', '--format', help='specify output format [default: %(default)s]"', default=FORMAT, choices=FORMATS.keys())
+    p.add_argument('-f', '--format', help='specify output format [default: %(default)s]"', default=FORMAT, choices=list(FORMATS.keys()) + EXPORT_FORMATS)
+    p.add_argument('-o', '--output', help='write results to a file instead of stdout')
+    p.add_argument('--error-rate', help='false positive rate for --format bloom [default: 0.001]')
+    p.add_argument('--flush-every', type=int, default=0,
+                   help='with --format ndjson, flush output after every N indicators [default: when the buffer fills]')
 
     p.add_argument('--indicator')
     p.add_argument('--tags', nargs='+')
@@ -93,6 +183,8 @@ def main():
     p.add_argument('--config', help='specify config file [default %(default)s]', default=CONFIG_PATH)
 
     p.add_argument('--feed', action='store_true')
+    p.add_argument('--diff-against', help='only output what was added, removed or changed in the feed since the '
+                                           'snapshot at this path (as json lines), then update the snapshot')
 
     p.add_argument('--no-verify-ssl', action='store_true')
 
@@ -274,6 +366,15 @@ def main():
             filters['limit'] = FEED_LIMIT
 
         try:
+            if args.diff_against:
+                diff_feed(cli, filters, args.diff_against, output=args.output)
+                raise SystemExit
+
+            if options.get('format') in EXPORT_FORMATS:
+                export_feed(cli, filters, options['format'], output=args.output, error_rate=args.error_rate,
+                            flush_every=args.flush_every)
+                raise SystemExit
+
             rv = cli.feed(filters=filters)
 
         except AuthError as e:
@@ -286,10 +387,14 @@ def main():
             logger.error(e)
 
         else:
-            print(FORMATS[options.get('format')](data=rv, cols=args.columns.split(',')))
+            _write(FORMATS[options.get('format')](data=rv, cols=args.columns.split(',')), args.output)
 
         raise SystemExit
 
+    if options.get('format') in EXPORT_FORMATS and options['format'] != 'ndjson':
+        logger.error('--format %s is only supported with --feed' % options['format'])
+        raise SystemExit
+
     try:
         rv = cli.search(filters)
 
@@ -305,7 +410,12 @@ def main():
         logger.error(e)
 
     else:
-        print(FORMATS[options.get('format')](data=rv, cols=args.columns.split(',')))
+        if options.get('format') == 'ndjson':
+            from cifsdk.feed.export import write_ndjson
+            write_ndjson(rv, args.output or sys.stdout, flush_every=args.flush_every)
+            raise SystemExit
+
+        _write(FORMATS[options.get('format')](data=rv, cols=args.columns.split(',')), args.output)
 
 
 if __name__ == "__main__":
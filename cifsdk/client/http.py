@@ -1,5 +1,8 @@
 import logging
 import requests
+import socket
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
 import time
 import json
 from cifsdk.exceptions import AuthError, TimeoutError, NotFound, SubmissionFailed, InvalidSearch, CIFBusy
@@ -7,10 +10,13 @@ from cifsdk.constants import VERSION, PYVERSION, TOKEN
 from pprint import pprint
 from base64 import b64decode
 from cifsdk.client.plugin import Client
+from cifsdk.utils.zjson import iter_array
 import os
-import zlib
-from time import sleep
-import random
+from cifsdk.utils import zcodec
+from cifsdk.client.retry import RetryPolicy
+from cifsdk.client.http_cache import HTTPCache
+from cifsdk.feed.table import FeedTable
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 if PYVERSION == 3:
     basestring = (str, bytes)
@@ -20,11 +26,16 @@ requests.packages.urllib3.disable_warnings()
 
 TRACE = os.environ.get('CIFSDK_CLIENT_HTTP_TRACE')
 TIMEOUT = os.getenv('CIFSDK_CLIENT_HTTP_TIMEOUT', 120)
-RETRIES = os.getenv('CIFSDK_CLIENT_HTTP_RETRIES', 5)
-RETRIES_DELAY = os.getenv('CIFSDK_CLIENT_HTTP_RETRIES_DELAY', '30,60')
-
-s, e = RETRIES_DELAY.split(',')
-RETRIES_DELAY = random.uniform(int(s), int(e))
+POOL_CONNECTIONS = os.getenv('CIFSDK_CLIENT_HTTP_POOL_CONNECTIONS', 10)
+POOL_MAXSIZE = os.getenv('CIFSDK_CLIENT_HTTP_POOL_MAXSIZE', 10)
+POOL_BLOCK = os.getenv('CIFSDK_CLIENT_HTTP_POOL_BLOCK', '0') in ['1', 'true', 'True']
+KEEPALIVE = os.getenv('CIFSDK_CLIENT_HTTP_KEEPALIVE', 0)  # tcp keep-alive idle seconds, 0 disables
+ACCEPT_ENCODING = os.getenv('CIFSDK_CLIENT_HTTP_ACCEPT_ENCODING')  # eg: zstd,gzip,deflate [default: all available]
+COMPRESSION = os.getenv('CIFSDK_CLIENT_HTTP_COMPRESSION', 'deflate')
+COMPRESSION_LEVEL = os.getenv('CIFSDK_CLIENT_HTTP_COMPRESSION_LEVEL')
+CHUNK_SIZE = int(os.getenv('CIFSDK_CLIENT_HTTP_CHUNK_SIZE', 65536))
+BULK_SIZE = int(os.getenv('CIFSDK_CLIENT_HTTP_BULK_SIZE', 500))
+BULK_WORKERS = int(os.getenv('CIFSDK_CLIENT_HTTP_BULK_WORKERS', 4))
 
 logger = logging.getLogger(__name__)
 
@@ -36,24 +47,92 @@ if TRACE:
     logging.getLogger('requests.packages.urllib3.connectionpool').setLevel(logging.DEBUG)
 
 
+def _keepalive_options(idle):
+    opts = list(HTTPConnection.default_socket_options)
+    opts.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        opts.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        opts.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, idle // 3)))
+
+    if hasattr(socket, 'TCP_KEEPCNT'):
+        opts.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3))
+
+    return opts
+
+
+class PoolAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with optional TCP keep-alive and connection pool statistics
+    """
+
+    def __init__(self, keepalive=0, **kwargs):
+        self.keepalive = int(keepalive)
+        super(PoolAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keepalive:
+            kwargs['socket_options'] = _keepalive_options(self.keepalive)
+
+        super(PoolAdapter, self).init_poolmanager(*args, **kwargs)
+
+    def stats(self):
+        rv = {'pools': 0, 'requests': 0, 'hits': 0, 'new_connections': 0, 'tls_handshakes': 0}
+
+        pools = self.poolmanager.pools
+        for k in list(pools.keys()):
+            p = pools.get(k)
+            if p is None:
+                continue
+
+            rv['pools'] += 1
+            rv['requests'] += p.num_requests
+            rv['new_connections'] += p.num_connections
+            rv['hits'] += max(0, p.num_requests - p.num_connections)
+
+            if p.scheme == 'https':
+                rv['tls_handshakes'] += p.num_connections
+
+        return rv
+
+
 class HTTP(Client):
 
-    def __init__(self, remote, token=TOKEN, proxy=None, timeout=int(TIMEOUT), verify_ssl=True, **kwargs):
+    circuit_failures = Client.circuit_failures + (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+    def __init__(self, remote, token=TOKEN, proxy=None, timeout=int(TIMEOUT), verify_ssl=True,
+                 pool_connections=int(POOL_CONNECTIONS), pool_maxsize=int(POOL_MAXSIZE), pool_block=POOL_BLOCK,
+                 keepalive=int(KEEPALIVE), accept_encoding=ACCEPT_ENCODING, compression=COMPRESSION,
+                 compression_level=COMPRESSION_LEVEL, **kwargs):
         super(HTTP, self).__init__(remote, token, **kwargs)
 
         self.proxy = proxy
         self.timeout = timeout
         self.verify_ssl = verify_ssl
         self.nowait = kwargs.get('nowait', False)
+        self.retry_policy = kwargs.get('retry_policy') or RetryPolicy()
+        self.compression = compression
+        self.compression_level = None if compression_level is None else int(compression_level)
+
+        self.cache = kwargs.get('cache')
+        if self.cache is True:
+            self.cache = HTTPCache()
 
         self.session = requests.Session()
+        self.adapter = PoolAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                   pool_block=pool_block, keepalive=keepalive)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
         self.session.headers["Accept"] = 'application/vnd.cif.v3+json'
         self.session.headers['User-Agent'] = 'cifsdk-py/{}'.format(VERSION)
         self.session.headers['Authorization'] = 'Token token=' + self.token
         self.session.headers['Content-Type'] = 'application/json'
-        self.session.headers['Accept-Encoding'] = 'deflate'
+        self.session.headers['Accept-Encoding'] = zcodec.accept_encoding(accept_encoding)
 
-    def _check_status(self, resp, expect=200):
+    @staticmethod
+    def _check_status(resp, expect=200):
         if resp.status_code == 400:
             r = json.loads(resp.text)
             raise InvalidSearch(r['message'])
@@ -77,50 +156,69 @@ class HTTP(Client):
         if resp.status_code in [500, 501, 502, 503, 504]:
             raise CIFBusy('system seems busy..')
 
-        if resp.status_code != expect:
+        if resp.status_code not in (expect if isinstance(expect, (list, tuple)) else [expect]):
             msg = 'unknown: %s' % resp.content
             raise RuntimeError(msg)
 
-    def _get(self, uri, params={}, retry=True):
+    def pool_stats(self):
+        """
+        Connection pool statistics; requests made, hits (requests served over an existing connection),
+        new connections and tls handshakes
+        """
+        return self.adapter.stats()
+
+    def _request(self, method, uri, expect=200, retry=True, **kwargs):
         if not uri.startswith('http'):
             uri = self.remote + uri
 
-        resp = self.session.get(uri, params=params, verify=self.verify_ssl, timeout=self.timeout)
-        n = RETRIES
-        try:
-            self._check_status(resp, expect=200)
-            n = 0
-        except Exception as e:
-            if resp.status_code == 429 or resp.status_code in [500, 501, 502, 503, 504]:
-                logger.error(e)
-            else:
-                raise e
+        with self._circuit():
+            started = time.time()
+            attempt = 0
 
-        while n != 0:
-            logger.warning('setting random retry interval to spread out the load')
-            logger.warning('retrying in %.00fs' % RETRIES_DELAY)
-            sleep(RETRIES_DELAY)
+            while True:
+                resp = getattr(self.session, method)(uri, verify=self.verify_ssl, timeout=self.timeout, **kwargs)
 
-            resp = self.session.get(uri, params=params, verify=self.verify_ssl, timeout=self.timeout)
-            if resp.status_code == 200:
-                break
+                if not retry or resp.status_code not in self.retry_policy.retry_on:
+                    self._check_status(resp, expect=expect)
+                    return resp
 
-            if n == 0:
-                raise CIFBusy('system seems busy.. try again later')
+                delay = self.retry_policy.delay(attempt, time.time() - started, resp.headers.get('Retry-After'))
+                if delay is None:
+                    self._check_status(resp, expect=expect)
 
-        data = resp.content
+                logger.warning('%s: retrying in %.2fs (attempt %i)' % (resp.status_code, delay, attempt + 1))
+                resp.close()
+                self.retry_policy.sleep(delay)
+                attempt += 1
 
-        s = (int(resp.headers['Content-Length']) / 1024 / 1024)
-        logger.info('processing %.2f megs' % s)
+    def _get_resp(self, uri, params={}, stream=False):
+        return self._request('get', uri, params=params, stream=stream)
+
+    @staticmethod
+    def _decode_data(data):
+        if data == '{}':
+            return []
 
-        msgs = json.loads(data.decode('utf-8'))
+        if isinstance(data, basestring) and data.startswith('{"hits":{"hits":[{"_source":'):
+            data = json.loads(data)
+            data = [r['_source'] for r in data['hits']['hits']]
 
-        if msgs.get('data') and msgs['data'] == '{}':
-            msgs['data'] = []
+        return data
 
-        if msgs.get('data') and isinstance(msgs['data'], basestring) and msgs['data'].startswith('{"hits":{"hits":[{"_source":'):
-            msgs['data'] = json.loads(msgs['data'])
-            msgs['data'] = [r['_source'] for r in msgs['data']['hits']['hits']]
+    @staticmethod
+    def _decode_message(m):
+        if isinstance(m, dict) and m.get('message'):
+            try:
+                m['message'] = b64decode(m['message'])
+            except Exception as e:
+                pass
+
+        return m
+
+    @staticmethod
+    def _decode_msgs(msgs):
+        if msgs.get('data'):
+            msgs['data'] = HTTP._decode_data(msgs['data'])
 
         if not msgs.get('status') and not msgs.get('message') == 'success':
             raise RuntimeError(msgs)
@@ -130,13 +228,84 @@ class HTTP(Client):
 
         if isinstance(msgs.get('data'), list):
             for m in msgs['data']:
-                if m.get('message'):
-                    try:
-                        m['message'] = b64decode(m['message'])
-                    except Exception as e:
-                        pass
+                HTTP._decode_message(m)
+
+        return msgs
+
+    def _iter_body(self, resp):
+        # read the body off the wire as-is and decompress it ourselves, as it arrives
+        if hasattr(resp.raw, 'stream'):
+            chunks = resp.raw.stream(CHUNK_SIZE, decode_content=False)
+        else:
+            chunks = iter(lambda: resp.raw.read(CHUNK_SIZE), b'')
+
+        return zcodec.iter_decompress(chunks, resp.headers.get('Content-Encoding'))
+
+    def _get(self, uri, params={}, retry=True, cache=False):
+        if cache and self.cache is not None:
+            return self._get_cached(uri, params=params)
+
+        resp = self._get_resp(uri, params=params, stream=True)
+
+        try:
+            data = b''.join(self._iter_body(resp))
+        finally:
+            resp.close()
+
+        s = (len(data) / 1024 / 1024)
+        logger.info('processing %.2f megs' % s)
+
+        return self._decode_msgs(json.loads(data.decode('utf-8')))
+
+    def _get_cached(self, uri, params={}):
+        key = self.cache.key(uri, params, remote=self.remote, token=self.token)
+        hit = self.cache.get(key)
+
+        if hit and self.cache.fresh(hit[0]):
+            logger.debug('cache hit: %s' % key)
+            return self._decode_msgs(json.loads(hit[1].decode('utf-8')))
+
+        headers = {}
+        if hit:
+            headers = self.cache.validators(hit[0])
+
+        resp = self._request('get', uri, expect=[200, 304], params=params, stream=True, headers=headers)
+
+        try:
+            if resp.status_code == 304 and hit:
+                logger.debug('cache revalidated: %s' % key)
+                self.cache.refresh(key, resp.headers)
+                return self._decode_msgs(json.loads(hit[1].decode('utf-8')))
+
+            if resp.status_code == 304:
+                raise RuntimeError('unexpected 304 for an uncached request')
+
+            data = b''.join(self._iter_body(resp))
+        finally:
+            resp.close()
+
+        msgs = self._decode_msgs(json.loads(data.decode('utf-8')))
+        self.cache.set(key, data, resp.headers)
         return msgs
 
+    def _get_iter(self, uri, params={}):
+        resp = self._get_resp(uri, params=params, stream=True)
+
+        meta = {}
+        try:
+            for d in iter_array(self._iter_body(resp), key='data', meta=meta):
+                d = self._decode_data(d)
+                if not isinstance(d, list):
+                    d = [d]
+
+                for m in d:
+                    yield self._decode_message(m)
+        finally:
+            resp.close()
+
+        if meta.get('status') == 'failed':
+            raise InvalidSearch(meta.get('message'))
+
     def _post(self, uri, data):
         if type(data) == dict:
             data = json.dumps(data)
@@ -147,36 +316,16 @@ class HTTP(Client):
         if isinstance(data, str):
             data = data.encode('utf-8')
 
-        data = zlib.compress(data)
+        size = len(data)
+        data = zcodec.compress(data, self.compression, self.compression_level)
+        logger.debug('%s: %i bytes compressed to %i (%.1fx)' % (self.compression, size, len(data),
+                                                                 float(size) / max(1, len(data))))
         headers = {
-            'Content-Encoding': 'deflate'
+            'Content-Encoding': self.compression
         }
 
-
-        resp = self.session.post(uri, data=data, verify=self.verify_ssl, headers=headers, timeout=self.timeout)
-
+        resp = self._request('post', uri, expect=201, data=data, headers=headers)
         logger.debug(resp.content)
-        n = RETRIES
-        try:
-            self._check_status(resp, expect=201)
-            n = 0
-        except Exception as e:
-            if resp.status_code == 429 or resp.status_code in [500, 501, 502, 503, 504]:
-                logger.error(e)
-            else:
-                raise e
-
-        while n != 0:
-            logger.info('setting random retry interval to spread out the load')
-            logger.info('retrying in %.00fs' % RETRIES_DELAY)
-            sleep(RETRIES_DELAY)
-
-            resp = self.session.post(uri, data=data, verify=self.verify_ssl, headers=headers, timeout=self.timeout)
-            if resp.status_code in [200, 201]:
-                break
-
-            if n == 0:
-                raise CIFBusy('system seems busy.. try again later')
 
         return json.loads(resp.content.decode('utf-8'))
 
@@ -188,13 +337,11 @@ class HTTP(Client):
         if params.get('limit'):
             del params['limit']
 
-        resp = self.session.delete(uri, data=json.dumps(params), verify=self.verify_ssl, timeout=self.timeout)
-        self._check_status(resp)
+        resp = self._request('delete', uri, retry=False, data=json.dumps(params))
         return json.loads(resp.content.decode('utf-8'))
 
     def _patch(self, uri, data):
-        resp = self.session.patch(uri, data=json.dumps(data), verify=self.verify_ssl, timeout=self.timeout)
-        self._check_status(resp)
+        resp = self._request('patch', uri, retry=False, data=json.dumps(data))
         return json.loads(resp.content.decode('utf-8'))
 
     def indicators_search(self, filters):
@@ -209,6 +356,46 @@ class HTTP(Client):
         rv = self._post(uri, data)
         return rv["data"]
 
+    def indicators_create_bulk(self, data, batch_size=BULK_SIZE, workers=BULK_WORKERS):
+        """
+        Submit an iterable of indicators (Indicator objects, dicts or json strings) as json arrays of up to
+        batch_size indicators. Each batch is serialised and compressed once and up to `workers` batches are
+        posted concurrently over the pooled session. The iterable is consumed lazily.
+
+        :return: dict of 'results' and 'failures', lists of {'batch': n, 'count': n, 'data' or 'error': ..}
+        """
+        uri = "{0}/indicators".format(self.remote)
+        logger.debug(uri)
+
+        rv = {'results': [], 'failures': []}
+        pending = {}
+
+        def _collect(done):
+            for f in done:
+                n, count = pending.pop(f)
+                try:
+                    rv['results'].append({'batch': n, 'count': count, 'data': f.result()['data']})
+                except Exception as e:
+                    logger.error('batch %i failed: %s' % (n, e))
+                    rv['failures'].append({'batch': n, 'count': count, 'error': e})
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for n, batch in enumerate(self._batch_indicators(data, batch_size)):
+                f = pool.submit(self._post, uri, json.dumps(batch))
+                pending[f] = (n, len(batch))
+
+                # keep the pool's queue bounded rather than reading the whole iterable into it
+                if len(pending) >= (workers * 2):
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    _collect(done)
+
+            done, _ = wait(pending)
+            _collect(done)
+
+        rv['results'].sort(key=lambda r: r['batch'])
+        rv['failures'].sort(key=lambda r: r['batch'])
+        return rv
+
     def indicators_delete(self, filters):
         uri = "{0}/indicators".format(self.remote)
         logger.debug(uri)
@@ -216,9 +403,28 @@ class HTTP(Client):
         return rv["data"]
 
     def feed(self, filters):
-        rv = self._get('/feed', params=filters)
+        rv = self._get('/feed', params=filters, cache=True)
         return rv['data']
 
+    def feed_iter(self, filters):
+        """
+        Stream a feed, yielding one indicator dict at a time as it is decoded off the wire,
+        memory stays flat regardless of the size of the feed
+
+        :param filters: dict of feed filters (eg: itype, tags, confidence)
+        :return: generator of indicator dicts
+        """
+        return self._get_iter('/feed', params=filters)
+
+    def feed_table(self, filters):
+        """
+        Stream a feed into a FeedTable, a compact column oriented alternative to the list of dicts feed() returns
+
+        :param filters: dict of feed filters
+        :return: cifsdk.feed.table.FeedTable
+        """
+        return FeedTable.from_indicators(self.feed_iter(filters))
+
     def ping(self, write=False):
         t0 = time.time()
 
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from cifsdk.client.plugin import AsyncClient
+from cifsdk.client.http import HTTP, TIMEOUT, ACCEPT_ENCODING, COMPRESSION, COMPRESSION_LEVEL
+from cifsdk.client.retry import RetryPolicy
+from cifsdk.constants import VERSION, TOKEN
+from cifsdk.utils import zcodec
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+CONCURRENCY = os.getenv('CIFSDK_CLIENT_HTTP_CONCURRENCY', 32)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHTTP(AsyncClient):
+    """
+    asyncio flavour of the HTTP client, same method surface as cifsdk.client.http.HTTP, but every call is a
+    coroutine. At most `concurrency` requests are in flight at any given time.
+
+        async with AsyncHTTP(remote, token) as cli:
+            rv = await asyncio.gather(*[cli.indicators_search({'indicator': i}) for i in indicators])
+    """
+
+    if httpx is not None:
+        circuit_failures = AsyncClient.circuit_failures + (httpx.TransportError,)
+
+    def __init__(self, remote, token=TOKEN, proxy=None, timeout=int(TIMEOUT), verify_ssl=True,
+                 concurrency=int(CONCURRENCY), accept_encoding=ACCEPT_ENCODING, compression=COMPRESSION,
+                 compression_level=COMPRESSION_LEVEL, **kwargs):
+        super(AsyncHTTP, self).__init__(remote, token, **kwargs)
+
+        if httpx is None:
+            raise ImportError('the asyncio http client requires httpx: pip install cifsdk[async]')
+
+        self.proxy = proxy
+        self.timeout = timeout
+        self.verify_ssl = verify_ssl
+        self.nowait = kwargs.get('nowait', False)
+        self.concurrency = int(concurrency)
+        self.retry_policy = kwargs.get('retry_policy') or RetryPolicy()
+        self.compression = compression
+        self.compression_level = None if compression_level is None else int(compression_level)
+        self._semaphore = None
+
+        self.session = httpx.AsyncClient(
+            verify=verify_ssl,
+            timeout=timeout,
+            transport=kwargs.get('transport'),
+            headers={
+                'Accept': 'application/vnd.cif.v3+json',
+                'User-Agent': 'cifsdk-py/{}'.format(VERSION),
+                'Authorization': 'Token token=' + self.token,
+                'Content-Type': 'application/json',
+                'Accept-Encoding': zcodec.accept_encoding(accept_encoding),
+            }
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        await self.session.aclose()
+
+    @property
+    def semaphore(self):
+        # created lazily so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        return self._semaphore
+
+    async def _request(self, method, uri, expect=200, retry=True, **kwargs):
+        if not uri.startswith('http'):
+            uri = self.remote + uri
+
+        with self._circuit():
+            started = time.time()
+            attempt = 0
+
+            while True:
+                async with self.semaphore:
+                    resp = await self.session.request(method, uri, **kwargs)
+
+                if not retry or resp.status_code not in self.retry_policy.retry_on:
+                    HTTP._check_status(resp, expect=expect)
+                    return resp
+
+                delay = self.retry_policy.delay(attempt, time.time() - started, resp.headers.get('Retry-After'))
+                if delay is None:
+                    HTTP._check_status(resp, expect=expect)
+
+                logger.warning('%s: retrying in %.2fs (attempt %i)' % (resp.status_code, delay, attempt + 1))
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _get(self, uri, params={}):
+        # encode params the way requests does, None is dropped and bools become 'True'/'False'
+        params = {k: (str(v) if isinstance(v, bool) else v) for k, v in params.items() if v is not None}
+
+        resp = await self._request('GET', uri, params=params)
+        return HTTP._decode_msgs(json.loads(resp.content.decode('utf-8')))
+
+    async def _post(self, uri, data):
+        if type(data) == dict:
+            data = json.dumps(data)
+
+        if self.nowait:
+            uri = '{}?nowait=1'.format(uri)
+
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        data = zcodec.compress(data, self.compression, self.compression_level)
+        headers = {
+            'Content-Encoding': self.compression
+        }
+
+        resp = await self._request('POST', uri, expect=201, content=data, headers=headers)
+        logger.debug(resp.content)
+        return json.loads(resp.content.decode('utf-8'))
+
+    async def _delete(self, uri, params={}):
+        params = {f: params[f] for f in params if params.get(f)}
+        if params.get('nolog'):
+            del params['nolog']
+
+        if params.get('limit'):
+            del params['limit']
+
+        resp = await self._request('DELETE', uri, retry=False, content=json.dumps(params))
+        return json.loads(resp.content.decode('utf-8'))
+
+    async def _patch(self, uri, data):
+        resp = await self._request('PATCH', uri, retry=False, content=json.dumps(data))
+        return json.loads(resp.content.decode('utf-8'))
+
+    async def search(self, data):
+        return await self.indicators_search(data)
+
+    async def indicators_search(self, filters):
+        rv = await self._get('/search', params=filters)
+        return rv['data']
+
+    async def indicators_create(self, data):
+        data = str(data).encode('utf-8')
+
+        uri = "{0}/indicators".format(self.remote)
+        logger.debug(uri)
+        rv = await self._post(uri, data)
+        return rv["data"]
+
+    async def indicators_delete(self, filters):
+        uri = "{0}/indicators".format(self.remote)
+        logger.debug(uri)
+        rv = await self._delete(uri, params=filters)
+        return rv["data"]
+
+    async def feed(self, filters):
+        rv = await self._get('/feed', params=filters)
+        return rv['data']
+
+    async def ping(self, write=False):
+        t0 = time.time()
+
+        uri = '/ping'
+        if write:
+            uri = '/ping?write=1'
+
+        rv = await self._get(uri)
+
+        if rv:
+            rv = (time.time() - t0)
+            logger.debug('return time: %.15f' % rv)
+
+        return rv
+
+    async def tokens_search(self, filters):
+        rv = await self._get('{}/tokens'.format(self.remote), params=filters)
+        return rv['data']
+
+    async def tokens_delete(self, data):
+        rv = await self._delete('{}/tokens'.format(self.remote), data)
+        return rv['data']
+
+    async def tokens_create(self, data):
+        logger.debug(data)
+        rv = await self._post('{}/tokens'.format(self.remote), data)
+        return rv['data']
+
+    async def tokens_edit(self, data):
+        rv = await self._patch('{}/tokens'.format(self.remote), data)
+        return rv['data']
+
+Plugin = AsyncHTTP
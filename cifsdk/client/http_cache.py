@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from cifsdk.constants import RUNTIME_PATH
+from cifsdk.client.plugin import filters_key
+
+CACHE_PATH = os.getenv('CIFSDK_CLIENT_HTTP_CACHE_PATH', os.path.join(RUNTIME_PATH, 'cifsdk-cache'))
+CACHE_TTL = os.getenv('CIFSDK_CLIENT_HTTP_CACHE_TTL', 300)
+CACHE_SIZE = os.getenv('CIFSDK_CLIENT_HTTP_CACHE_SIZE', 512 * 1024 * 1024)  # bytes
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPCache(object):
+    """
+    On-disk response cache, keyed by the remote, token, uri and its normalised params.
+
+    Entries younger than `ttl` seconds are served without touching the network, older ones are revalidated with
+    If-None-Match / If-Modified-Since. Once the cache grows past `max_size` bytes the least recently used entries
+    are evicted.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_size=CACHE_SIZE):
+        self.path = path
+        self.ttl = float(ttl)
+        self.max_size = int(max_size)
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+    @staticmethod
+    def key(uri, params={}, remote=None, token=None):
+        """
+        :param remote: the client's remote, so different CIF instances don't share entries
+        :param token: the client's token (only a hash of it is used), tokens can see different groups
+        """
+        if token is not None:
+            token = hashlib.sha256(str(token).encode('utf-8')).hexdigest()
+
+        k = json.dumps([remote, token, uri, filters_key(params)], default=str)
+        return hashlib.sha256(k.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.path, '%s.json' % key), os.path.join(self.path, '%s.meta' % key)
+
+    def _write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+
+        os.replace(tmp, path)
+
+    def get(self, key):
+        """
+        :return: (meta, body) or None
+        """
+        body, meta = self._paths(key)
+        try:
+            with open(meta) as f:
+                m = json.load(f)
+
+            with open(body, 'rb') as f:
+                b = f.read()
+
+        except (IOError, OSError, ValueError):
+            return None
+
+        # mtime doubles as the lru clock
+        os.utime(meta, None)
+        return m, b
+
+    def fresh(self, meta):
+        return (time.time() - meta['stored']) < self.ttl
+
+    @staticmethod
+    def validators(meta):
+        h = {}
+        if meta.get('etag'):
+            h['If-None-Match'] = meta['etag']
+
+        if meta.get('last_modified'):
+            h['If-Modified-Since'] = meta['last_modified']
+
+        return h
+
+    def set(self, key, data, headers={}):
+        body, meta = self._paths(key)
+
+        m = {
+            'stored': time.time(),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'size': len(data),
+        }
+
+        self._write(body, data)
+        self._write(meta, json.dumps(m).encode('utf-8'))
+        self.evict()
+
+    def refresh(self, key, headers={}):
+        """
+        Mark an entry as fresh again, eg: after a 304
+        """
+        body, meta = self._paths(key)
+        with open(meta) as f:
+            m = json.load(f)
+
+        m['stored'] = time.time()
+        if headers.get('ETag'):
+            m['etag'] = headers['ETag']
+
+        self._write(meta, json.dumps(m).encode('utf-8'))
+
+    def evict(self):
+        entries = []
+        total = 0
+        for f in os.listdir(self.path):
+            if not f.endswith('.meta'):
+                continue
+
+            key = f[:-5]
+            body, meta = self._paths(key)
+            try:
+                size = os.path.getsize(body)
+                entries.append((os.path.getmtime(meta), size, key))
+            except OSError:
+                continue
+
+            total += size
+
+        for _, size, key in sorted(entries):
+            if total <= self.max_size:
+                break
+
+            logger.debug('evicting: %s' % key)
+            for p in self._paths(key):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+            total -= size
@@ -1,24 +1,187 @@
 import abc
+import asyncio
+import json
 import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from csirtg_indicator import Indicator
+from cifsdk.constants import PYVERSION
+from cifsdk.exceptions import CIFBusy, TimeoutError, CIFConnectionError
+from cifsdk.client.breaker import CircuitBreaker
+
+COALESCE = os.getenv('CIFSDK_CLIENT_COALESCE', '0') in ['1', 'true', 'True']
+SEARCH_WORKERS = os.getenv('CIFSDK_CLIENT_SEARCH_WORKERS', 8)
+
+if PYVERSION == 3:
+    basestring = (str, bytes)
+
+
+def filters_key(filters):
+    """
+    Hashable, order independent key for a filters dict, None/empty values are dropped and lists are sorted
+    """
+    k = []
+    for f in sorted(filters):
+        v = filters[f]
+        if v is None or v == '' or v == []:
+            continue
+
+        if isinstance(v, (list, tuple, set)):
+            v = tuple(sorted(str(vv) for vv in v))
+
+        k.append((f, v))
+
+    return tuple(k)
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
 
 
 class Client(object):
 
+    # exceptions counted as failures by the circuit breaker
+    circuit_failures = (CIFBusy, TimeoutError, CIFConnectionError)
+
     def __init__(self, remote, token, **kwargs):
         self.remote = remote
         self.token = str(token)
 
+        self.circuit_breaker = kwargs.get('circuit_breaker')
+        if self.circuit_breaker is True:
+            self.circuit_breaker = CircuitBreaker()
+
+        self.coalesce = kwargs.get('coalesce', COALESCE)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def _single_flight(self, key, func, *args):
+        """
+        Run func(*args) once for any number of concurrent callers sharing the same key, every caller gets the same
+        result (or exception)
+        """
+        with self._inflight_lock:
+            c = self._inflight.get(key)
+            leader = c is None
+            if leader:
+                c = self._inflight[key] = _Call()
+
+        if not leader:
+            c.event.wait()
+            if c.error is not None:
+                raise c.error
+
+            return c.result
+
+        try:
+            c.result = func(*args)
+
+        except Exception as e:
+            c.error = e
+            raise
+
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+            c.event.set()
+
+        return c.result
+
+    @contextmanager
+    def _circuit(self):
+        """
+        Wrap a round trip to the backend, fails fast with CircuitOpen while the circuit breaker (if any) is open
+        """
+        if not self.circuit_breaker:
+            yield
+            return
+
+        self.circuit_breaker.allow()
+
+        try:
+            yield
+
+        except self.circuit_failures:
+            self.circuit_breaker.failure()
+            raise
+
+        except Exception:
+            # the backend answered, just not with what we wanted
+            self.circuit_breaker.success()
+            raise
+
+        except BaseException:
+            # cancelled (eg: asyncio.wait_for), KeyboardInterrupt, GeneratorExit, ..
+            self.circuit_breaker.release()
+            raise
+
+        self.circuit_breaker.success()
+
     def _kv_to_indicator(self, kv):
         return Indicator(**kv)
 
+    def _batch_indicators(self, data, size):
+        """
+        Lazily group an iterable of Indicator objects, dicts or json strings into lists of dicts, only one batch
+        is held in memory at a time
+
+        :param data: iterable (eg: a generator reading from a file)
+        :param size: max number of indicators per batch
+        :return: generator of lists
+        """
+        batch = []
+        for i in data:
+            if isinstance(i, Indicator):
+                i = i.__dict__()
+
+            elif isinstance(i, basestring):
+                i = json.loads(i)
+
+            batch.append(i)
+            if len(batch) == size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
     @abc.abstractmethod
     def ping(self, write=False):
         raise NotImplementedError
 
     def search(self, data):
+        # with coalesce on, concurrent identical searches share a single request to the backend
+        if getattr(self, 'coalesce', False):
+            return self._single_flight(filters_key(data), self.indicators_search, data)
+
         return self.indicators_search(data)
 
+    def indicators_search_many(self, indicators, workers=int(SEARCH_WORKERS), **filters):
+        """
+        Look up many indicators in one call. A CIF search takes a single indicator, so the lookups are spread
+        over a pool of `workers` threads (transports that can pipeline requests override this).
+
+        :param indicators: iterable of indicators, duplicates are looked up once
+        :param filters: extra filters applied to every lookup (eg: confidence, limit)
+        :return: dict of indicator -> list of hits
+        """
+        indicators = list(OrderedDict.fromkeys(indicators))
+
+        def _search(i):
+            f = dict(filters)
+            f['indicator'] = i
+            return i, self.search(f)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(pool.map(_search, indicators))
+
     @abc.abstractmethod
     def indicators_create(self, data):
         raise NotImplementedError
@@ -26,3 +189,24 @@ class Client(object):
     @abc.abstractmethod
     def indicators_search(self, data):
         raise NotImplementedError
+
+
+class AsyncClient(Client):
+    """
+    Base for the asyncio clients, indicators_search is a coroutine
+    """
+
+    async def indicators_search_many(self, indicators, **filters):
+        """
+        Look up many indicators concurrently
+
+        :return: dict of indicator -> list of hits
+        """
+        indicators = list(OrderedDict.fromkeys(indicators))
+
+        async def _search(i):
+            f = dict(filters)
+            f['indicator'] = i
+            return i, await self.indicators_search(f)
+
+        return dict(await asyncio.gather(*[_search(i) for i in indicators]))
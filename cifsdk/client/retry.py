@@ -0,0 +1,93 @@
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+RETRIES = os.getenv('CIFSDK_CLIENT_HTTP_RETRIES', 5)
+RETRIES_DELAY = os.getenv('CIFSDK_CLIENT_HTTP_RETRIES_DELAY', '1,60')  # base,cap
+RETRIES_MAX_ELAPSED = os.getenv('CIFSDK_CLIENT_HTTP_RETRIES_MAX_ELAPSED', 300)
+
+RETRY_ON = (429, 500, 501, 502, 503, 504)
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy(object):
+    """
+    Exponential backoff with full jitter: the n'th retry waits a random time between 0 and min(cap, base * 2^n)
+    seconds. A Retry-After header on a 429/503 takes precedence over the computed backoff. Retrying stops after
+    `retries` attempts or once the total time spent waiting would exceed `max_elapsed` seconds.
+
+    The policy keeps running totals of the retries performed and seconds waited, see stats().
+    """
+
+    def __init__(self, retries=RETRIES, base=None, cap=None, max_elapsed=RETRIES_MAX_ELAPSED, retry_on=RETRY_ON,
+                 sleep=time.sleep):
+        b, c = RETRIES_DELAY.split(',')
+
+        self.retries = int(retries)
+        self.base = float(b if base is None else base)
+        self.cap = float(c if cap is None else cap)
+        self.max_elapsed = float(max_elapsed) if max_elapsed else None
+        self.retry_on = retry_on
+        self.sleep = sleep
+
+        self._lock = threading.Lock()
+        self.total_retries = 0
+        self.total_waited = 0.0
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+    @staticmethod
+    def retry_after(value):
+        """
+        Parse a Retry-After header, either delay-seconds or an HTTP-date
+
+        :return: seconds to wait, or None
+        """
+        if not value:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        t = parsedate_tz(value)
+        if t is None:
+            return None
+
+        return max(0.0, mktime_tz(t) - time.time())
+
+    def delay(self, attempt, elapsed=0, retry_after=None):
+        """
+        :param attempt: number of retries already performed for this request
+        :param elapsed: seconds since the first attempt
+        :param retry_after: optional Retry-After header value
+        :return: seconds to wait before the next attempt, or None if the retry budget is spent
+        """
+        if attempt >= self.retries:
+            return None
+
+        d = self.retry_after(retry_after)
+        if d is None:
+            d = self.backoff(attempt)
+
+        if self.max_elapsed is not None and (elapsed + d) > self.max_elapsed:
+            logger.debug('retry budget of %.0fs exhausted' % self.max_elapsed)
+            return None
+
+        with self._lock:
+            self.total_retries += 1
+            self.total_waited += d
+
+        return d
+
+    def stats(self):
+        return {
+            'retries': self.total_retries,
+            'waited': self.total_waited,
+        }
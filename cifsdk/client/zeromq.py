@@ -1,6 +1,6 @@
 import time
 import json
-from cifsdk.client import Client
+from cifsdk.client.plugin import Client
 from cifsdk.msg import Msg
 from cifsdk.exceptions import AuthError, CIFConnectionError, TimeoutError, InvalidSearch, CIFBusy
 from cifsdk.constants import PYVERSION
@@ -8,7 +8,7 @@ from csirtg_indicator import Indicator
 import logging
 import os
 import zlib
-from zmq.eventloop.ioloop import IOLoop
+from collections import OrderedDict
 from pprint import pprint
 
 import zmq
@@ -20,6 +20,13 @@ ENCODING_DEFAULT = "utf-8"
 SEARCH_LIMIT = 100
 FIREBALL_SIZE = os.getenv('CIFSDK_CLIENT_ZEROMQ_FIREBALL_SIZE', 500)
 FIREBALL_SIZE = int(FIREBALL_SIZE)
+FIREBALL_WINDOW = os.getenv('CIFSDK_CLIENT_ZEROMQ_FIREBALL_WINDOW', 4)
+FIREBALL_TIMEOUT = os.getenv('CIFSDK_CLIENT_ZEROMQ_FIREBALL_TIMEOUT', RCVTIMEO)  # per batch
+FIREBALL_RETRIES = os.getenv('CIFSDK_CLIENT_ZEROMQ_FIREBALL_RETRIES', 3)
+RETRIES = os.getenv('CIFSDK_CLIENT_ZEROMQ_RETRIES', 3)
+
+# tag pipelined messages with an id frame, only for routers that echo it back (see ZMQ._send_window)
+MESSAGE_IDS = os.getenv('CIFSDK_CLIENT_ZEROMQ_MESSAGE_IDS', '0') == '1'
 
 logger = logging.getLogger(__name__)
 
@@ -41,21 +48,52 @@ class ZMQ(Client):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.socket.close()
+        self.close()
         self.context.term()
 
     def __init__(self, remote, token, **kwargs):
-        super(ZMQ, self).__init__(remote, token)
+        super(ZMQ, self).__init__(remote, token, **kwargs)
 
         self.context = zmq.Context.instance()
-        self.socket = self.context.socket(zmq.REQ)
-        self.socket.RCVTIMEO = RCVTIMEO
-        self.socket.SNDTIMEO = SNDTIMEO
-        self.socket.setsockopt(zmq.LINGER, LINGER)
+        self.socket = None
+        self.timeout = int(kwargs.get('timeout', RCVTIMEO))
+        self.retries = int(kwargs.get('retries', RETRIES))
+        self.persistent = kwargs.get('persistent', False)
         self.autoclose = kwargs.get('autoclose', True)
         self.nowait = kwargs.get('nowait', False)
+        self.fireball_window = int(kwargs.get('fireball_window', FIREBALL_WINDOW))
+        self.fireball_timeout = int(kwargs.get('fireball_timeout', FIREBALL_TIMEOUT))
+        self.fireball_retries = int(kwargs.get('fireball_retries', FIREBALL_RETRIES))
+        self.message_ids = kwargs.get('message_ids', MESSAGE_IDS)
+
+    def _connect(self):
+        if self.socket is not None and not self.socket.closed:
+            return self.socket
+
         if self.nowait:
             self.socket = self.context.socket(zmq.DEALER)
+        else:
+            self.socket = self.context.socket(zmq.REQ)
+
+        self.socket.RCVTIMEO = self.timeout
+        self.socket.SNDTIMEO = int(SNDTIMEO)
+        self.socket.setsockopt(zmq.LINGER, LINGER)
+        self.socket.connect(self.remote)
+        return self.socket
+
+    def _reconnect(self):
+        # lazy pirate, a REQ socket that timed out is stuck waiting on a reply, throw it away
+        if self.socket is not None and not self.socket.closed:
+            self.socket.setsockopt(zmq.LINGER, 0)
+            self.socket.close()
+
+        self.socket = None
+
+    def close(self):
+        if self.socket is not None and not self.socket.closed:
+            self.socket.close()
+
+        self.socket = None
 
     def _recv(self, decode=True):
         mtype, data = Msg().recv(self.socket)
@@ -63,6 +101,10 @@ class ZMQ(Client):
         if not decode:
             return data
 
+        return self._decode(data)
+
+    @staticmethod
+    def _decode(data):
         data = json.loads(data)
 
         if data.get('message') == 'unauthorized':
@@ -98,33 +140,48 @@ class ZMQ(Client):
 
         return data.get('data')
 
-    def _send(self, mtype, data='[]', nowait=False, decode=True):
-
-        self.socket.connect(self.remote)
-
+    def _send(self, mtype, data='[]', nowait=False, decode=True, retry=False):
         if isinstance(data, str):
             data = data.encode('utf-8')
 
-        Msg(mtype=mtype, token=self.token, data=data).send(self.socket)
+        retries = self.retries if retry else 0
+
+        with self._circuit():
+            while True:
+                self._connect()
 
-        if self.nowait or nowait:
-            if self.autoclose:
-                self.socket.close()
-            logger.debug('not waiting for a resp')
-            return
+                try:
+                    Msg(mtype=mtype, token=self.token, data=data).send(self.socket)
 
-        rv = self._recv(decode=decode)
-        self.socket.close()
-        return rv
+                    if self.nowait or nowait:
+                        logger.debug('not waiting for a resp')
+                        return
+
+                    rv = self._recv(decode=decode)
+
+                except zmq.Again:
+                    self._reconnect()
+                    if retries == 0:
+                        raise TimeoutError('timeout')
+
+                    retries -= 1
+                    logger.warning('timeout, reconnecting to %s (%i retries left)' % (self.remote, retries))
+                    continue
+
+                finally:
+                    if not self.persistent and (self.autoclose or not (self.nowait or nowait)):
+                        self.close()
+
+                return rv
 
     def ping(self, write=False):
         if write:
             return self._send(Msg.PING_WRITE)
 
-        return self._send(Msg.PING)
+        return self._send(Msg.PING, retry=True)
 
     def tokens_search(self, filters={}):
-        return self._send(Msg.TOKENS_SEARCH, json.dumps(filters))
+        return self._send(Msg.TOKENS_SEARCH, json.dumps(filters), retry=True)
 
     def tokens_create(self, data):
         return self._send(Msg.TOKENS_CREATE, data)
@@ -135,76 +192,196 @@ class ZMQ(Client):
     def tokens_edit(self, data):
         return self._send(Msg.TOKENS_EDIT, data)
 
-    def _handle_message_fireball(self, s, e):
-        logger.debug('message received')
-
-        id, mtype, data = Msg().recv(s)
-
-        self.response.append(data)
-
-        self.num_responses -= 1
-        logger.debug('num responses remaining: %i' % self.num_responses)
+    def _send_window(self, mtype, payloads, window=None, timeout=None, retries=None, strict=False):
+        """
+        Pipeline a series of messages over a DEALER socket using a credit based window. At most `window` messages
+        are un-acknowledged at any given time, the next one is sent as each reply arrives. Each message has its own
+        timeout.
+
+        By default messages go out in the usual [token, mtype, data] framing and each reply acknowledges the oldest
+        message in flight. A reply can't be tied to the message it answers, so when a message times out (or comes
+        back busy) with more than one in flight there is no telling which one was lost, the whole call fails rather
+        than re-send the wrong one. Only a window of 1 is retried.
+
+        With message_ids on, every message is prefixed with an id frame ([id, null, token, mtype, data]), replies
+        are matched by it and only the messages that time out (or come back busy) are re-sent. That framing needs a
+        router that accepts the extra frames and echoes the id back, older routers can't parse it.
+
+        :param mtype: Msg type
+        :param payloads: iterable of message payloads (consumed lazily)
+        :param window: max number of un-acknowledged messages
+        :param timeout: per message timeout (ms)
+        :param retries: number of times a single message is re-sent before giving up
+        :param strict: raise rather than fall back to the oldest message when a reply can't be matched by its id
+        :return: list of raw replies, in payload order
+        """
+        window = int(window or self.fireball_window)
+        timeout = int(timeout or self.fireball_timeout) / 1000.0
+        retries = self.fireball_retries if retries is None else int(retries)
+
+        s = self.context.socket(zmq.DEALER)
+        s.SNDTIMEO = int(SNDTIMEO)
+        s.setsockopt(zmq.LINGER, LINGER)
+        s.connect(self.remote)
+
+        poller = zmq.Poller()
+        poller.register(s, zmq.POLLIN)
+
+        payloads = enumerate(payloads)
+        inflight = OrderedDict()  # seq -> [payload, attempt, deadline]
+        replies = {}
+        failed = []
+        done = False
+
+        # replies credited to the oldest message rather than matched by id
+        guessed = not self.message_ids
+
+        def _send(seq, payload, attempt):
+            # the id frame carries the sequence and attempt, so a late reply to an earlier attempt still counts
+            id = None
+            if self.message_ids:
+                id = '{}.{}'.format(seq, attempt).encode('utf-8')
+
+            Msg(id=id, mtype=mtype, token=self.token, data=payload).send(s)
+            inflight[seq] = [payload, attempt, time.time() + timeout]
 
-        if self.num_responses == 0:
-            logger.debug('finishing up...')
-            self.loop.stop()
-
-    def _fireball_timeout(self):
-        logger.warn('timeout')
-        self.loop.stop()
-        raise TimeoutError('timeout')
+        try:
+            while True:
+                while not done and len(inflight) < window:
+                    try:
+                        seq, payload = next(payloads)
+                    except StopIteration:
+                        done = True
+                        break
+
+                    _send(seq, payload, 0)
+
+                if not inflight:
+                    break
+
+                logger.debug('in flight: %i' % len(inflight))
+
+                wait = min(b[2] for b in inflight.values()) - time.time()
+                if poller.poll(max(0, wait * 1000)):
+                    m = s.recv_multipart()
+
+                    seq = None
+                    if self.message_ids:
+                        try:
+                            seq = int(m[0].decode('utf-8').split('.')[0])
+                        except (ValueError, UnicodeDecodeError):
+                            if strict:
+                                raise RuntimeError('reply without a message id, cannot match it to a request')
+
+                            logger.warning('reply without a message id, acknowledging the oldest message')
+                            guessed = True
+
+                    if seq is None:
+                        seq = next(iter(inflight))
+
+                    b = inflight.pop(seq, None)
+                    if b is None:
+                        logger.debug('discarding duplicate reply: %s' % m[0])
+                        continue
+
+                    data = m[-1].decode('utf-8')
+                    try:
+                        busy = json.loads(data).get('message') == 'busy'
+                    except (ValueError, AttributeError):
+                        busy = False
+
+                    if not busy:
+                        replies[seq] = data
+                        continue
+
+                    if guessed and window > 1:
+                        raise CIFBusy('router busy, cannot tell which of the %i messages in flight was refused'
+                                      % (len(inflight) + 1))
+
+                    logger.warning('router busy, re-queueing message: %i' % seq)
+                    inflight[seq] = b
+                    b[2] = 0
+
+                now = time.time()
+                expired = [seq for seq in inflight if inflight[seq][2] <= now]
+                if expired and guessed and window > 1:
+                    raise TimeoutError('timeout, cannot tell which of the %i messages in flight was lost'
+                                       % len(inflight))
+
+                for seq in expired:
+                    payload, attempt, _ = inflight.pop(seq)
+                    if attempt >= retries:
+                        logger.error('giving up on message: %i' % seq)
+                        failed.append(seq)
+                        continue
+
+                    logger.warning('timeout, re-sending message: %i' % seq)
+                    _send(seq, payload, attempt + 1)
+
+        finally:
+            s.close()
+
+        if failed:
+            raise TimeoutError('%i messages failed: %s' % (len(failed), ','.join(str(f) for f in failed)))
+
+        return [replies[seq] for seq in sorted(replies)]
 
     def _send_fireball(self, mtype, data):
-        if len(data) < 3:
-            logger.error('no data to send')
-            return []
+        if isinstance(data, basestring):
+            if len(data) < 3:
+                logger.error('no data to send')
+                return []
 
-        self.loop = IOLoop()
-        self.socket = self.context.socket(zmq.DEALER)
-        self.socket.connect(self.remote)
+            if PYVERSION == 3:
+                if isinstance(data, bytes):
+                    data = data.decode('utf-8')
 
-        timeout = time.time() + SNDTIMEO
-        self.loop.add_timeout(timeout, self._fireball_timeout)
-        self.response = []
+            data = json.loads(data)
 
-        self.loop.add_handler(self.socket, self._handle_message_fireball, zmq.POLLIN)
+            if not isinstance(data, list):
+                data = [data]
 
-        if PYVERSION == 3:
-            if isinstance(data, bytes):
-                data = data.decode('utf-8')
+        with self._circuit():
+            return self._send_window(mtype, self._batch_indicators(data, FIREBALL_SIZE))
 
-        data = json.loads(data)
+    def indicators_search(self, filters, decode=True):
+        return self._send(Msg.INDICATORS_SEARCH, json.dumps(filters), decode=decode, retry=True)
 
-        if not isinstance(data, list):
-            data = [data]
+    def indicators_search_many(self, indicators, window=None, **filters):
+        """
+        Look up many indicators in one call. With message_ids on, the searches are pipelined over a single DEALER
+        socket with at most `window` (default: fireball_window) outstanding at a time and every reply is matched to
+        its search by id. Without ids a reply can't be tied to its search, so they are sent one at a time.
 
-        if (len(data) % FIREBALL_SIZE) == 0:
-            self.num_responses = int((len(data) / FIREBALL_SIZE))
-        else:
-            self.num_responses = int((len(data) / FIREBALL_SIZE)) + 1
+        :return: dict of indicator -> list of hits
+        """
+        indicators = list(OrderedDict.fromkeys(indicators))
 
-        logger.debug('responses expected: %i' % self.num_responses)
+        if not self.message_ids:
+            rv = {}
+            for i in indicators:
+                f = dict(filters)
+                f['indicator'] = i
+                rv[i] = self.search(f)
 
-        batch = []
-        for d in data:
-            batch.append(d)
-            if len(batch) == FIREBALL_SIZE:
-                Msg(mtype=Msg.INDICATORS_CREATE, token=self.token, data=batch).send(self.socket)
-                batch = []
+            return rv
 
-        if len(batch):
-            Msg(mtype=Msg.INDICATORS_CREATE, token=self.token, data=batch).send(self.socket)
+        def _payloads():
+            for i in indicators:
+                f = dict(filters)
+                f['indicator'] = i
+                yield json.dumps(f)
 
-        logger.debug("starting loop to receive")
-        self.loop.start()
-        self.loop.close()
-        self.socket.close()
-        return self.response
+        with self._circuit():
+            rv = self._send_window(Msg.INDICATORS_SEARCH, _payloads(), window=window, strict=True)
 
-    def indicators_search(self, filters, decode=True):
-        return self._send(Msg.INDICATORS_SEARCH, json.dumps(filters), decode=decode)
+        return {i: self._decode(r) for i, r in zip(indicators, rv)}
 
     def indicators_create(self, data, nowait=False, fireball=False):
+        """
+        :param data: Indicator, dict or json string. In fireball mode, any iterable of Indicator objects, dicts
+                     or json strings, consumed lazily in batches of FIREBALL_SIZE
+        """
         if isinstance(data, dict):
             data = self._kv_to_indicator(data)
 
@@ -0,0 +1,186 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+
+import zmq
+import zmq.asyncio
+
+from cifsdk.client.plugin import AsyncClient
+from cifsdk.client.zeromq import ZMQ, RCVTIMEO, SNDTIMEO, LINGER
+from cifsdk.msg import Msg
+from cifsdk.exceptions import TimeoutError
+from csirtg_indicator import Indicator
+
+TRACE = os.getenv('CIFSDK_CLIENT_ZEROMQ_TRACE') or os.getenv('CIFSDK_CLIENT_ZMQ_TRACE')
+
+logger = logging.getLogger(__name__)
+
+logger.setLevel(logging.ERROR)
+
+if TRACE:
+    logger.setLevel(logging.DEBUG)
+
+
+class AsyncZMQ(AsyncClient):
+    """
+    asyncio flavour of the ZMQ client built on zmq.asyncio. Requests are pipelined over a single DEALER socket,
+    each one carries a request id in the Msg id frame and replies are matched back to their caller by that id,
+    so any number of searches and submissions can be outstanding at once. Messages go out as
+    [id, null, token, mtype, data], which needs a router that accepts the id frame and echoes it back.
+
+        async with AsyncZMQ(remote, token) as cli:
+            rv = await asyncio.gather(*[cli.indicators_search({'indicator': i}) for i in indicators])
+    """
+
+    def __init__(self, remote, token, **kwargs):
+        super(AsyncZMQ, self).__init__(remote, token, **kwargs)
+
+        self.context = kwargs.get('context') or zmq.asyncio.Context.instance()
+        self.timeout = int(kwargs.get('timeout', RCVTIMEO))
+        self.socket = None
+
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._reader = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _connect(self):
+        if self.socket is not None:
+            return self.socket
+
+        self.socket = self.context.socket(zmq.DEALER)
+        self.socket.SNDTIMEO = int(SNDTIMEO)
+        self.socket.setsockopt(zmq.LINGER, LINGER)
+        self.socket.connect(self.remote)
+
+        self._reader = asyncio.ensure_future(self._read())
+        return self.socket
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+
+            self._reader = None
+
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+        for f in self._pending.values():
+            if not f.done():
+                f.cancel()
+
+        self._pending.clear()
+
+    async def _read(self):
+        try:
+            while True:
+                m = await self.socket.recv_multipart()
+
+                # [id, (null,) mtype, data]
+                f = self._pending.pop(m[0], None)
+                if f is None:
+                    logger.debug('discarding reply for unknown request: %s' % m[0])
+                    continue
+
+                if not f.done():
+                    f.set_result(m[-1])
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.error(e)
+            for f in self._pending.values():
+                if not f.done():
+                    f.set_exception(e)
+
+            self._pending.clear()
+
+    async def _send(self, mtype, data='[]', nowait=False, decode=True):
+        self._connect()
+
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        id = str(next(self._ids)).encode('utf-8')
+
+        if nowait:
+            await self.socket.send_multipart(Msg(id=id, mtype=mtype, token=self.token, data=data).to_list())
+            logger.debug('not waiting for a resp')
+            return
+
+        with self._circuit():
+            f = asyncio.get_event_loop().create_future()
+            self._pending[id] = f
+
+            try:
+                await self.socket.send_multipart(Msg(id=id, mtype=mtype, token=self.token, data=data).to_list())
+                data = await asyncio.wait_for(f, self.timeout / 1000.0)
+
+            except asyncio.TimeoutError:
+                raise TimeoutError('timeout')
+
+            finally:
+                self._pending.pop(id, None)
+
+        data = data.decode('utf-8')
+        if not decode:
+            return data
+
+        return ZMQ._decode(data)
+
+    async def ping(self, write=False):
+        if write:
+            return await self._send(Msg.PING_WRITE)
+
+        return await self._send(Msg.PING)
+
+    async def search(self, data):
+        return await self.indicators_search(data)
+
+    async def tokens_search(self, filters={}):
+        return await self._send(Msg.TOKENS_SEARCH, json.dumps(filters))
+
+    async def tokens_create(self, data):
+        return await self._send(Msg.TOKENS_CREATE, data)
+
+    async def tokens_delete(self, data):
+        return await self._send(Msg.TOKENS_DELETE, data)
+
+    async def tokens_edit(self, data):
+        return await self._send(Msg.TOKENS_EDIT, data)
+
+    async def indicators_search(self, filters, decode=True):
+        return await self._send(Msg.INDICATORS_SEARCH, json.dumps(filters), decode=decode)
+
+    async def indicators_create(self, data, nowait=False):
+        if isinstance(data, dict):
+            data = self._kv_to_indicator(data)
+
+        if isinstance(data, Indicator):
+            data = str(data)
+
+        return await self._send(Msg.INDICATORS_CREATE, data, nowait=nowait)
+
+    async def indicators_delete(self, data):
+        if isinstance(data, dict):
+            data = self._kv_to_indicator(data)
+
+        if isinstance(data, Indicator):
+            data = str(data)
+
+        return await self._send(Msg.INDICATORS_DELETE, data)
+
+Plugin = AsyncZMQ
@@ -42,3 +42,8 @@ class SubmissionFailed(CIFException):
 class CIFBusy(CIFException):
     def __init__(self, msg='The system is extremely busy at the moment, try again later.'):
         self.msg = msg
+
+
+class CircuitOpen(CIFBusy):
+    def __init__(self, msg='Too many recent failures, not sending requests for a while, try again later.'):
+        self.msg = msg
@@ -0,0 +1,189 @@
+import gzip
+import heapq
+import json
+import logging
+import os
+import tempfile
+from hashlib import blake2b
+
+from cifsdk.utils.zjson import default
+
+CHUNK_SIZE = os.getenv('CIFSDK_FEED_DIFF_CHUNK_SIZE', 100000)
+
+# fields that change on every sighting, a re-report of the same indicator shouldn't count as a change
+IGNORE = ['id', 'uuid', 'reporttime', 'lasttime', 'count']
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+logger = logging.getLogger(__name__)
+
+_encode = json.JSONEncoder(separators=(',', ':'), default=default).encode
+_encode_sorted = json.JSONEncoder(separators=(',', ':'), sort_keys=True, default=default).encode
+
+
+def _key(i):
+    k = '%s\x1f%s' % (i['indicator'], i.get('provider') or '')
+    if '\t' in k or '\n' in k:
+        k = k.replace('\t', ' ').replace('\n', ' ')
+
+    return k
+
+
+def _hash(i, ignore):
+    d = {}
+    for k, v in i.items():
+        if k in ignore:
+            continue
+
+        if isinstance(v, list):
+            v = sorted(v, key=str)
+
+        d[k] = v
+
+    return blake2b(_encode_sorted(d).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _line(i, seq, ignore):
+    # the position in the feed breaks ties between duplicate keys, it is dropped from the final snapshot
+    return '%s\t%012d\t%s\t%s\n' % (_key(i), seq, _hash(i, ignore), _encode(i))
+
+
+def _order(line):
+    k, seq, _ = line.split('\t', 2)
+    return k, seq
+
+
+def _write_run(lines, dir):
+    lines.sort(key=_order)
+    fd, path = tempfile.mkstemp(dir=dir, suffix='.run')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+
+    return path
+
+
+def write_snapshot(indicators, path, ignore=IGNORE, chunk_size=CHUNK_SIZE):
+    """
+    Write a feed out as a snapshot: gzip'd lines of "key<TAB>hash<TAB>json", sorted by key (indicator + provider).
+
+    The feed is sorted externally, at most `chunk_size` lines are held in memory at a time. Duplicate keys keep
+    their first occurrence.
+
+    :param indicators: iterable of indicator dicts, eg: feed_iter()
+    :param path: where to write the snapshot, replaced atomically
+    :param ignore: fields left out of the hash
+    :return: number of entries written
+    """
+    chunk_size = int(chunk_size)
+    dir = os.path.dirname(os.path.abspath(path))
+    runs = []
+    n = 0
+
+    with tempfile.TemporaryDirectory(dir=dir) as tmp:
+        lines = []
+        for seq, i in enumerate(indicators):
+            lines.append(_line(i, seq, ignore))
+            if len(lines) >= chunk_size:
+                runs.append(_write_run(lines, tmp))
+                lines = []
+
+        fd, out = tempfile.mkstemp(dir=dir, suffix='.snapshot')
+        os.close(fd)
+
+        files = [open(r, encoding='utf-8') for r in runs]
+        try:
+            lines.sort(key=_order)
+            last = None
+            with gzip.open(out, 'wt', encoding='utf-8', compresslevel=1) as f:
+                for l in heapq.merge(lines, *files, key=_order):
+                    k, _, l = l.split('\t', 2)
+                    if k == last:
+                        continue
+
+                    last = k
+                    f.write('%s\t%s' % (k, l))
+                    n += 1
+        finally:
+            for f in files:
+                f.close()
+
+        os.replace(out, path)
+
+    logger.debug('snapshot: %i entries in %i runs' % (n, len(runs) + 1))
+    return n
+
+
+def iter_snapshot(path):
+    """
+    :return: generator of (key, hash, json) tuples in key order, empty if the snapshot doesn't exist
+    """
+    if not os.path.exists(path):
+        return
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for l in f:
+            k, h, d = l.rstrip('\n').split('\t', 2)
+            yield k, h, d
+
+
+def diff(old, new):
+    """
+    Merge join two snapshots
+
+    :param old: path to the previous snapshot
+    :param new: path to the current snapshot
+    :return: generator of (action, indicator dict), action being one of added, removed or changed
+    """
+    end = (None, None, None)
+    a = iter_snapshot(old)
+    b = iter_snapshot(new)
+    ka, ha, da = next(a, end)
+    kb, hb, db = next(b, end)
+
+    while ka is not None or kb is not None:
+        if kb is None or (ka is not None and ka < kb):
+            yield REMOVED, json.loads(da)
+            ka, ha, da = next(a, end)
+
+        elif ka is None or kb < ka:
+            yield ADDED, json.loads(db)
+            kb, hb, db = next(b, end)
+
+        else:
+            if ha != hb:
+                yield CHANGED, json.loads(db)
+
+            ka, ha, da = next(a, end)
+            kb, hb, db = next(b, end)
+
+
+def diff_feed(indicators, snapshot, ignore=IGNORE, update=True):
+    """
+    Diff a fresh feed pull against the snapshot of the previous one and, once the diff has been consumed, make
+    the fresh pull the new snapshot. If there is no previous snapshot everything is reported as added.
+
+        for action, i in diff_feed(cli.feed_iter(filters), '/var/lib/cif/scanner.snapshot'):
+            ...
+
+    :param indicators: iterable of indicator dicts
+    :param snapshot: path to the snapshot
+    :param update: replace the snapshot with the fresh pull
+    :return: generator of (action, indicator dict)
+    """
+    fd, new = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(snapshot)), suffix='.snapshot')
+    os.close(fd)
+
+    try:
+        write_snapshot(indicators, new, ignore=ignore)
+
+        for d in diff(snapshot, new):
+            yield d
+
+        if update:
+            os.replace(new, snapshot)
+
+    finally:
+        if os.path.exists(new):
+            os.remove(new)
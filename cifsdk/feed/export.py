@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+
+from cifsdk.utils.zarrow import parse_timestamp_cached
+from cifsdk.utils.zjson import default
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+BATCH_SIZE = os.getenv('CIFSDK_FEED_EXPORT_BATCH_SIZE', 65536)
+BUFFER_SIZE = os.getenv('CIFSDK_FEED_EXPORT_BUFFER_SIZE', 65536)  # bytes
+
+# column, type
+SCHEMA = [
+    ('indicator', 'string'),
+    ('itype', 'string'),
+    ('tlp', 'string'),
+    ('group', 'list'),
+    ('provider', 'string'),
+    ('confidence', 'float'),
+    ('count', 'int'),
+    ('reporttime', 'timestamp'),
+    ('firsttime', 'timestamp'),
+    ('lasttime', 'timestamp'),
+    ('tags', 'list'),
+    ('description', 'string'),
+    ('rdata', 'string'),
+    ('asn', 'string'),
+    ('asn_desc', 'string'),
+    ('cc', 'string'),
+    ('region', 'string'),
+]
+
+logger = logging.getLogger(__name__)
+
+_encode = json.JSONEncoder(separators=(',', ':'), default=default).encode
+
+
+def _types():
+    return {
+        'string': pyarrow.string(),
+        'float': pyarrow.float32(),
+        'int': pyarrow.int64(),
+        'timestamp': pyarrow.timestamp('s', tz='UTC'),
+        'list': pyarrow.list_(pyarrow.string()),
+    }
+
+
+def schema():
+    if pyarrow is None:
+        raise RuntimeError('arrow/parquet export requires pyarrow, pip install cifsdk[arrow]')
+
+    t = _types()
+    return pyarrow.schema([(c, t[k]) for c, k in SCHEMA])
+
+
+def _convert(v, kind):
+    if v is None or v == '':
+        return None
+
+    if kind == 'string':
+        if isinstance(v, (list, tuple)):
+            return ','.join(str(vv) for vv in v)
+
+        return str(v)
+
+    if kind == 'list':
+        if isinstance(v, str):
+            return v.split(',')
+
+        return [str(vv) for vv in v]
+
+    if kind == 'timestamp':
+        return parse_timestamp_cached(v).int_timestamp
+
+    if kind == 'float':
+        return float(v)
+
+    return int(v)
+
+
+def iter_batches(indicators, batch_size=BATCH_SIZE):
+    """
+    Transpose a stream of indicator dicts into arrow record batches of up to `batch_size` rows, only one batch
+    worth of values is held at a time
+
+    :param indicators: iterable of indicator dicts, eg: feed_iter()
+    :return: generator of pyarrow.RecordBatch
+    """
+    s = schema()
+    batch_size = int(batch_size)
+    columns = [[] for _ in SCHEMA]
+    n = 0
+
+    for i in indicators:
+        for (c, kind), values in zip(SCHEMA, columns):
+            values.append(_convert(i.get(c), kind))
+
+        n += 1
+        if n == batch_size:
+            yield pyarrow.RecordBatch.from_arrays([pyarrow.array(v, f.type) for v, f in zip(columns, s)], schema=s)
+            columns = [[] for _ in SCHEMA]
+            n = 0
+
+    if n:
+        yield pyarrow.RecordBatch.from_arrays([pyarrow.array(v, f.type) for v, f in zip(columns, s)], schema=s)
+
+
+def write_parquet(indicators, where, batch_size=BATCH_SIZE, compression='snappy'):
+    """
+    Stream indicators into a parquet file, one row group per batch
+
+    :param indicators: iterable of indicator dicts
+    :param where: path or writable binary file object
+    :return: number of rows written
+    """
+    n = 0
+    with pyarrow.parquet.ParquetWriter(where, schema(), compression=compression) as w:
+        for b in iter_batches(indicators, batch_size):
+            w.write_batch(b)
+            n += b.num_rows
+
+    logger.debug('parquet: %i rows written' % n)
+    return n
+
+
+def write_arrow_ipc(indicators, where, batch_size=BATCH_SIZE):
+    """
+    Stream indicators out in the arrow ipc streaming format (read back with pyarrow.ipc.open_stream)
+
+    :param indicators: iterable of indicator dicts
+    :param where: path or writable binary file object
+    :return: number of rows written
+    """
+    n = 0
+    with pyarrow.ipc.new_stream(where, schema()) as w:
+        for b in iter_batches(indicators, batch_size):
+            w.write_batch(b)
+            n += b.num_rows
+
+    logger.debug('arrow-ipc: %i rows written' % n)
+    return n
+
+
+def write_ndjson(indicators, where, flush_every=0, buffer_size=BUFFER_SIZE):
+    """
+    Write indicators as newline delimited json as they come in, lines are buffered up to `buffer_size` bytes
+    between writes
+
+    :param indicators: iterable of indicator dicts
+    :param where: path or writable text file object
+    :param flush_every: also write and flush after this many indicators, 0 to only flush when the buffer fills
+    :return: number of indicators written
+    """
+    flush_every = int(flush_every)
+    buffer_size = int(buffer_size)
+
+    f = open(where, 'w', encoding='utf-8') if isinstance(where, str) else where
+    buf = []
+    size = 0
+    n = 0
+
+    try:
+        for i in indicators:
+            l = _encode(i) + '\n'
+            buf.append(l)
+            size += len(l)
+            n += 1
+
+            if size >= buffer_size or (flush_every and n % flush_every == 0):
+                f.write(''.join(buf))
+                f.flush()
+                buf = []
+                size = 0
+
+        if buf:
+            f.write(''.join(buf))
+
+        f.flush()
+
+    finally:
+        if f is not where:
+            f.close()
+
+    return n
@@ -0,0 +1,306 @@
+import logging
+import time
+from array import array
+
+from cifsdk.utils.zarrow import epoch
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# columns kept by a FeedTable, everything else on an indicator is dropped
+COLUMNS = ['indicator', 'itype', 'tlp', 'provider', 'confidence', 'reporttime', 'firsttime', 'lasttime', 'tags']
+
+TIMES = ['reporttime', 'firsttime', 'lasttime']
+
+# dictionary encoded columns and the width of their codes
+ENCODED = {'itype': 'B', 'tlp': 'B', 'provider': 'I'}
+
+logger = logging.getLogger(__name__)
+
+
+def _format(epoch):
+    if not epoch:
+        return None
+
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+
+def _view(a):
+    if not len(a):
+        return np.empty(0, dtype=a.typecode)
+
+    return np.frombuffer(a, dtype=a.typecode)
+
+
+class _Dictionary(object):
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, v):
+        c = self.codes.get(v)
+        if c is None:
+            c = self.codes[v] = len(self.values)
+            self.values.append(v)
+
+        return c
+
+
+class FeedTable(object):
+    """
+    Column oriented, array backed container for feed results, a small fraction of the memory of a list of dicts
+
+        t = cli.feed_table({'itype': 'ipv4', 'tags': 'scanner'})
+        t = t.filter(confidence=8, since='2019-01-01')
+        for i in t:
+            ...
+
+    indicators are packed into a single utf-8 buffer, timestamps are stored as epoch seconds, itype, tlp, provider
+    and tags are dictionary encoded. Rows are only turned back into dicts when they are accessed. filter() returns
+    a new table sharing the same columns, it is vectorised with numpy when that is installed.
+    """
+
+    def __init__(self):
+        self._indicator = bytearray()
+        self._offsets = array('Q', [0])
+
+        self._dicts = {c: _Dictionary() for c in list(ENCODED) + ['tags']}
+        self._codes = {c: array(t) for c, t in ENCODED.items()}
+
+        self._confidence = array('f')
+        self._times = {c: array('q') for c in TIMES}
+
+        self._tags = array('I')
+        self._tag_offsets = array('Q', [0])
+
+        # selected rows, None for all of them
+        self._rows = None
+
+    @classmethod
+    def from_indicators(cls, indicators):
+        """
+        :param indicators: iterable of indicator dicts, eg: feed_iter()
+        """
+        t = cls()
+        t.extend(indicators)
+        return t
+
+    def append(self, i):
+        if self._rows is not None:
+            raise RuntimeError('cannot append to a filtered table')
+
+        self._indicator.extend(i['indicator'].encode('utf-8'))
+        self._offsets.append(len(self._indicator))
+
+        for c, codes in self._codes.items():
+            codes.append(self._dicts[c].encode(i.get(c)))
+
+        self._confidence.append(float(i.get('confidence') or 0))
+
+        for c, a in self._times.items():
+            a.append(epoch(i.get(c)) or 0)
+
+        tags = i.get('tags') or []
+        if isinstance(tags, str):
+            tags = tags.split(',')
+
+        d = self._dicts['tags']
+        self._tags.extend(d.encode(t) for t in tags)
+        self._tag_offsets.append(len(self._tags))
+
+    def extend(self, indicators):
+        for i in indicators:
+            self.append(i)
+
+    def _size(self):
+        return len(self._offsets) - 1
+
+    def __len__(self):
+        if self._rows is None:
+            return self._size()
+
+        return len(self._rows)
+
+    def _row(self, n):
+        i = {
+            'indicator': self._indicator[self._offsets[n]:self._offsets[n + 1]].decode('utf-8'),
+            'confidence': self._confidence[n],
+        }
+
+        for c, codes in self._codes.items():
+            i[c] = self._dicts[c].values[codes[n]]
+
+        for c, a in self._times.items():
+            i[c] = _format(a[n])
+
+        values = self._dicts['tags'].values
+        i['tags'] = [values[t] for t in self._tags[self._tag_offsets[n]:self._tag_offsets[n + 1]]]
+        return i
+
+    def _base(self, i):
+        if self._rows is None:
+            return i
+
+        return self._rows[i]
+
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+
+        if not 0 <= i < n:
+            raise IndexError('row index out of range')
+
+        return self._row(self._base(i))
+
+    def __iter__(self):
+        rows = range(self._size()) if self._rows is None else self._rows
+        for n in rows:
+            yield self._row(n)
+
+    def column(self, name):
+        """
+        :return: list of the values of column `name` for the selected rows, timestamps as epoch seconds
+        """
+        rows = range(self._size()) if self._rows is None else self._rows
+
+        if name == 'indicator':
+            b, o = self._indicator, self._offsets
+            return [b[o[n]:o[n + 1]].decode('utf-8') for n in rows]
+
+        if name == 'confidence':
+            a = self._confidence
+        elif name in self._times:
+            a = self._times[name]
+        elif name in self._codes:
+            values, codes = self._dicts[name].values, self._codes[name]
+            return [values[codes[n]] for n in rows]
+        elif name == 'tags':
+            return [self._row(n)['tags'] for n in rows]
+        else:
+            raise KeyError(name)
+
+        return [a[n] for n in rows]
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory used by the columns
+        """
+        arrays = [self._indicator, self._offsets, self._confidence, self._tags, self._tag_offsets]
+        arrays += list(self._codes.values()) + list(self._times.values())
+
+        n = sum(len(a) * getattr(a, 'itemsize', 1) for a in arrays)
+        if self._rows is not None:
+            n += len(self._rows) * self._rows.itemsize
+
+        return n
+
+    def _lookup(self, column, values):
+        if values is None:
+            return None
+
+        if isinstance(values, str):
+            values = values.split(',')
+
+        codes = self._dicts[column].codes
+        return set(codes[v] for v in values if v in codes)
+
+    def _select(self, rows):
+        t = FeedTable.__new__(FeedTable)
+        t.__dict__.update(self.__dict__)
+        t._rows = rows
+        return t
+
+    def filter(self, confidence=None, itype=None, tags=None, provider=None, since=None, until=None):
+        """
+        :param confidence: minimum confidence
+        :param itype: itype or list of itypes
+        :param tags: tag or list of tags, rows with any of them match
+        :param provider: provider or list of providers
+        :param since: rows reported at or after this time (timestamp or epoch)
+        :param until: rows reported at or before this time (timestamp or epoch)
+        :return: FeedTable of the matching rows
+        """
+        f = {
+            'confidence': float(confidence) if confidence is not None else None,
+            'itype': self._lookup('itype', itype),
+            'provider': self._lookup('provider', provider),
+            'tags': self._lookup('tags', tags),
+            'since': epoch(since) if since is not None else None,
+            'until': epoch(until) if until is not None else None,
+        }
+
+        if np is not None:
+            return self._select(self._filter_numpy(**f))
+
+        return self._select(self._filter(**f))
+
+    def _filter(self, confidence, itype, provider, tags, since, until):
+        rows = range(self._size()) if self._rows is None else self._rows
+        c, rt = self._confidence, self._times['reporttime']
+        itypes, providers = self._codes['itype'], self._codes['provider']
+        t, to = self._tags, self._tag_offsets
+
+        rv = array('I')
+        for n in rows:
+            if confidence is not None and c[n] < confidence:
+                continue
+
+            if itype is not None and itypes[n] not in itype:
+                continue
+
+            if provider is not None and providers[n] not in provider:
+                continue
+
+            if since is not None and rt[n] < since:
+                continue
+
+            if until is not None and rt[n] > until:
+                continue
+
+            if tags is not None and tags.isdisjoint(t[to[n]:to[n + 1]]):
+                continue
+
+            rv.append(n)
+
+        return rv
+
+    def _filter_numpy(self, confidence, itype, provider, tags, since, until):
+        n = self._size()
+        m = np.ones(n, dtype=bool)
+
+        if confidence is not None:
+            m &= _view(self._confidence) >= confidence
+
+        if itype is not None:
+            m &= np.isin(_view(self._codes['itype']), list(itype))
+
+        if provider is not None:
+            m &= np.isin(_view(self._codes['provider']), list(provider))
+
+        if since is not None or until is not None:
+            rt = _view(self._times['reporttime'])
+            if since is not None:
+                m &= rt >= since
+
+            if until is not None:
+                m &= rt <= until
+
+        if tags is not None:
+            hits = np.zeros(n, dtype=bool)
+            owner = np.repeat(np.arange(n), np.diff(_view(self._tag_offsets)).astype(np.int64))
+            hits[owner[np.isin(_view(self._tags), list(tags))]] = True
+            m &= hits
+
+        if self._rows is not None:
+            rows = _view(self._rows)
+            rows = rows[m[rows]]
+        else:
+            rows = np.flatnonzero(m)
+
+        rv = array('I')
+        rv.frombytes(rows.astype(np.uint32).tobytes())
+        return rv
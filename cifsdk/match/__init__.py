@@ -0,0 +1,24 @@
+class Matcher(object):
+    """
+    Base for the in-memory matchers, subclasses implement add(indicator, record=None) returning whether it was added
+    """
+
+    def add(self, indicator, record=None):
+        raise NotImplementedError
+
+    def update(self, indicators):
+        """
+        :param indicators: iterable of indicator dicts (eg: feed() or feed_iter()) or strings
+        :return: number of indicators added
+        """
+        n = 0
+        for i in indicators:
+            if isinstance(i, dict):
+                ok = self.add(i['indicator'], i)
+            else:
+                ok = self.add(i)
+
+            if ok:
+                n += 1
+
+        return n
@@ -0,0 +1,150 @@
+import logging
+import math
+import os
+import struct
+from hashlib import blake2b
+
+from cifsdk.match import Matcher
+
+ERROR_RATE = os.getenv('CIFSDK_BLOOM_ERROR_RATE', 0.001)
+
+MAGIC = b'CIFB'
+VERSION = 1
+
+# magic, version, hash count, bits, items
+_header = struct.Struct('!4sBBQQ')
+
+logger = logging.getLogger(__name__)
+
+
+def _key(indicator):
+    return indicator.strip().lower().encode('utf-8')
+
+
+class BloomFilter(Matcher):
+    """
+    Bloom filter over feed indicators, sized for `capacity` items at a false positive rate of `error_rate`.
+
+        b = BloomFilter.from_indicators(cli.feed_iter(filters), error_rate=0.0001)
+        b.save('scanner.bloom')
+
+        b = BloomFilter.load('scanner.bloom')
+        if '192.0.2.1' in b:
+            cli.indicators_search({'indicator': '192.0.2.1'})
+
+    Membership is exact match on the (case folded) indicator string, a miss is definitive, a hit only means the
+    indicator is probably listed. Positions come from a single blake2b digest split in two and combined with
+    double hashing (Kirsch-Mitzenmacher).
+    """
+
+    def __init__(self, capacity, error_rate=ERROR_RATE, bits=None, hashes=None, data=None, count=0):
+        error_rate = float(error_rate)
+        if not 0 < error_rate < 1:
+            raise ValueError('error_rate must be between 0 and 1')
+
+        capacity = max(int(capacity), 1)
+
+        if bits is None:
+            bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+
+        if hashes is None:
+            hashes = max(1, int(round(float(bits) / capacity * math.log(2))))
+
+        self.bits = max(int(bits), 8)
+        self.hashes = int(hashes)
+        self.count = count
+
+        if data is None:
+            data = bytearray((self.bits + 7) // 8)
+
+        self.data = data
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, indicator):
+        d = blake2b(_key(indicator), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], 'little')
+        h2 = int.from_bytes(d[8:], 'little') | 1
+        m = self.bits
+        return [(h1 + i * h2) % m for i in range(self.hashes)]
+
+    def add(self, indicator, record=None):
+        """
+        :param record: ignored, a bloom filter only holds membership
+        """
+        data = self.data
+        for p in self._positions(indicator):
+            data[p >> 3] |= 1 << (p & 7)
+
+        self.count += 1
+        return True
+
+    def __contains__(self, indicator):
+        data = self.data
+        for p in self._positions(indicator):
+            if not data[p >> 3] & (1 << (p & 7)):
+                return False
+
+        return True
+
+    def contains_many(self, indicators):
+        """
+        :return: list of booleans, one per indicator
+        """
+        return [i in self for i in indicators]
+
+    @property
+    def error_rate(self):
+        """
+        Expected false positive rate given the number of items added so far
+        """
+        return (1 - math.exp(-float(self.hashes) * self.count / self.bits)) ** self.hashes
+
+    @classmethod
+    def from_indicators(cls, indicators, error_rate=ERROR_RATE):
+        """
+        :param indicators: iterable of indicator dicts (eg: feed() or feed_iter()) or strings
+        """
+        keys = set()
+        for i in indicators:
+            if isinstance(i, dict):
+                i = i['indicator']
+
+            keys.add(i.strip().lower())
+
+        b = cls(len(keys), error_rate=error_rate)
+        b.update(keys)
+        logger.debug('bloom: %i items, %i bits, %i hashes, %i bytes' % (b.count, b.bits, b.hashes, len(b.data)))
+        return b
+
+    def to_bytes(self):
+        return _header.pack(MAGIC, VERSION, self.hashes, self.bits, self.count) + bytes(self.data)
+
+    @classmethod
+    def from_bytes(cls, data):
+        try:
+            magic, version, hashes, bits, count = _header.unpack_from(data)
+        except struct.error:
+            raise ValueError('not a bloom filter')
+
+        if magic != MAGIC:
+            raise ValueError('not a bloom filter')
+
+        if version != VERSION:
+            raise ValueError('unsupported bloom filter version: %i' % version)
+
+        body = bytearray(data[_header.size:])
+        if len(body) != (bits + 7) // 8:
+            raise ValueError('truncated bloom filter')
+
+        return cls(max(count, 1), bits=bits, hashes=hashes, data=body, count=count)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
@@ -0,0 +1,259 @@
+import gzip
+import json
+import logging
+import re
+from collections import deque
+
+from cifsdk.match import Matcher
+from cifsdk.utils.zjson import default
+
+logger = logging.getLogger(__name__)
+
+RE_SCHEME = re.compile(r'^[a-z][a-z0-9+.-]*://', re.I)
+
+# trie nodes are dicts of label -> node, the records for a listed name sit under the empty label
+_LEAF = ''
+
+
+def _labels(name):
+    name = name.strip().lower().rstrip('.')
+    if name.startswith('*.'):
+        name = name[2:]
+
+    return name.split('.')[::-1]
+
+
+def _strip_scheme(url):
+    return RE_SCHEME.sub('', url.strip())
+
+
+def _dump(path, data):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'), default=default)
+
+
+def _load(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class DomainMatcher(Matcher):
+    """
+    Suffix matcher for fqdn feeds, a listed evil.com matches evil.com, a.evil.com, a.b.evil.com, ..
+
+        m = DomainMatcher(cli.feed({'itype': 'fqdn', 'confidence': 8}))
+        m.match('a.b.evil.com')     # records for the most specific listed parent
+        m.save('fqdn.json.gz')
+        m = DomainMatcher.load('fqdn.json.gz')
+
+    Names are stored label by label, right to left, so a lookup costs one dict hit per label.
+    """
+
+    def __init__(self, indicators=None):
+        self.root = {}
+        self.records = []
+
+        if indicators:
+            self.update(indicators)
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, name, record=None):
+        if record is None:
+            record = name
+
+        node = self.root
+        for l in _labels(name):
+            if not l:
+                logger.debug('skipping: %s' % name)
+                return False
+
+            node = node.setdefault(l, {})
+
+        if _LEAF in node:
+            self.records[node[_LEAF]].append(record)
+        else:
+            node[_LEAF] = len(self.records)
+            self.records.append([record])
+
+        return True
+
+    def match(self, name):
+        """
+        :param name: hostname
+        :return: list of records for the most specific listed name that is, or is a parent of, `name`, or None
+        """
+        node = self.root
+        best = None
+        for l in _labels(name):
+            if not l:
+                # malformed, eg: a..evil.com
+                return None
+
+            node = node.get(l)
+            if node is None:
+                break
+
+            if _LEAF in node:
+                best = node[_LEAF]
+
+        if best is None:
+            return None
+
+        return self.records[best]
+
+    def match_many(self, names):
+        """
+        :return: list with the match() result for each name
+        """
+        return [self.match(n) for n in names]
+
+    def __contains__(self, name):
+        return self.match(name) is not None
+
+    def save(self, path):
+        _dump(path, {'root': self.root, 'records': self.records})
+
+    @classmethod
+    def load(cls, path):
+        d = _load(path)
+        m = cls()
+        m.root = d['root']
+        m.records = d['records']
+        return m
+
+
+class URLMatcher(Matcher):
+    """
+    Aho-Corasick automaton over url feeds, finds every listed url that occurs anywhere in a line (eg: a proxy log
+    entry) in a single pass over the line, regardless of how many urls are listed.
+
+    Matching is case insensitive and the scheme is dropped from listed urls, http://evil.com/x matches both
+    https://evil.com/x?a=1 and "GET evil.com/x".
+    """
+
+    def __init__(self, indicators=None):
+        self.patterns = []
+        self.records = []
+        self._index = {}
+
+        self.goto = None
+        self.fail = None
+        self.out = None
+
+        if indicators:
+            self.update(indicators)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def add(self, url, record=None):
+        if record is None:
+            record = url
+
+        p = _strip_scheme(url).lower()
+        if not p:
+            return False
+
+        if p in self._index:
+            self.records[self._index[p]].append(record)
+            return True
+
+        self._index[p] = len(self.patterns)
+        self.patterns.append(p)
+        self.records.append([record])
+        self.goto = None
+        return True
+
+    def build(self):
+        goto = [{}]
+        out = [[]]
+
+        for i, p in enumerate(self.patterns):
+            s = 0
+            for c in p:
+                n = goto[s].get(c)
+                if n is None:
+                    n = len(goto)
+                    goto[s][c] = n
+                    goto.append({})
+                    out.append([])
+
+                s = n
+
+            out[s].append(i)
+
+        # breadth first so a state's failure target is always resolved before it
+        fail = [0] * len(goto)
+        q = deque(goto[0].values())
+        while q:
+            s = q.popleft()
+            for c, n in goto[s].items():
+                q.append(n)
+
+                f = fail[s]
+                while f and c not in goto[f]:
+                    f = fail[f]
+
+                fail[n] = goto[f].get(c, 0)
+                out[n].extend(out[fail[n]])
+
+        self.goto, self.fail, self.out = goto, fail, out
+
+    def search(self, text):
+        """
+        :param text: url or log line
+        :return: indexes of the listed urls found in text, in the order they end
+        """
+        if self.goto is None:
+            self.build()
+
+        goto, fail, out = self.goto, self.fail, self.out
+        rv = []
+        s = 0
+        for c in text.lower():
+            while s and c not in goto[s]:
+                s = fail[s]
+
+            s = goto[s].get(c, 0)
+            if out[s]:
+                rv.extend(out[s])
+
+        return rv
+
+    def match(self, text):
+        """
+        :return: list of records for every listed url found in text, or None
+        """
+        rv = []
+        for i in self.search(text):
+            rv.extend(self.records[i])
+
+        return rv or None
+
+    def match_many(self, lines):
+        """
+        :return: list with the match() result for each line
+        """
+        return [self.match(l) for l in lines]
+
+    def __contains__(self, text):
+        return bool(self.search(text))
+
+    def save(self, path):
+        if self.goto is None:
+            self.build()
+
+        _dump(path, {'patterns': self.patterns, 'records': self.records, 'goto': self.goto, 'fail': self.fail,
+                     'out': self.out})
+
+    @classmethod
+    def load(cls, path):
+        d = _load(path)
+        m = cls()
+        m.patterns = d['patterns']
+        m.records = d['records']
+        m._index = {p: i for i, p in enumerate(m.patterns)}
+        m.goto, m.fail, m.out = d['goto'], d['fail'], d['out']
+        return m
@@ -0,0 +1,284 @@
+import ipaddress
+import logging
+import socket
+import struct
+from array import array
+
+from cifsdk.match import Matcher
+
+logger = logging.getLogger(__name__)
+
+_ipv4 = struct.Struct('!I')
+
+
+class _Tree(object):
+    """
+    Path compressed binary (Patricia) trie stored in parallel arrays, node 0 is the root (0/0).
+
+    Every insert adds at most two nodes, so a feed of n prefixes costs at most 2n nodes regardless of how long
+    the prefixes are. Lookups walk at most one node per bit of the address.
+    """
+
+    def __init__(self, width):
+        self.width = width
+
+        # ipv6 prefixes don't fit in a machine word, keep those in a plain list
+        self.prefix = array('I') if width == 32 else []
+        self.plen = array('B')
+        self.left = array('i')
+        self.right = array('i')
+        self.value = array('i')
+
+        self._node(0, 0)
+
+    def __len__(self):
+        return len(self.plen)
+
+    def _node(self, prefix, plen, value=-1):
+        self.prefix.append(prefix)
+        self.plen.append(plen)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.value.append(value)
+        return len(self.plen) - 1
+
+    def _mask(self, key, plen):
+        if plen == 0:
+            return 0
+
+        return (key >> (self.width - plen)) << (self.width - plen)
+
+    def _bit(self, key, i):
+        return (key >> (self.width - 1 - i)) & 1
+
+    def insert(self, key, plen, value):
+        """
+        :return: the value stored for key/plen, an existing value is kept
+        """
+        w = self.width
+        key = self._mask(key, plen)
+        node = 0
+
+        while True:
+            if self.plen[node] == plen:
+                if self.value[node] == -1:
+                    self.value[node] = value
+
+                return self.value[node]
+
+            children = self.right if self._bit(key, self.plen[node]) else self.left
+            child = children[node]
+
+            if child == -1:
+                children[node] = self._node(key, plen, value)
+                return value
+
+            cplen = self.plen[child]
+            n = min(cplen, plen)
+            cp = n - ((self.prefix[child] ^ key) >> (w - n)).bit_length()
+
+            if cp == cplen:
+                node = child
+                continue
+
+            # split the edge at the first differing bit
+            mid = self._node(self._mask(key, cp), cp)
+            children[node] = mid
+
+            if self._bit(self.prefix[child], cp):
+                self.right[mid] = child
+                other = self.left
+            else:
+                self.left[mid] = child
+                other = self.right
+
+            if cp == plen:
+                self.value[mid] = value
+            else:
+                other[mid] = self._node(key, plen, value)
+
+            return value
+
+    def walk(self, key, plen=None):
+        """
+        Yield the values of every stored prefix that contains key/plen, shortest first
+        """
+        w = self.width
+        if plen is None:
+            plen = w
+
+        prefix, plens, left, right, value = self.prefix, self.plen, self.left, self.right, self.value
+        node = 0
+
+        while node != -1:
+            p = plens[node]
+            if p > plen:
+                return
+
+            if p and (prefix[node] ^ key) >> (w - p):
+                return
+
+            if value[node] != -1:
+                yield value[node]
+
+            if p == w:
+                return
+
+            node = right[node] if (key >> (w - 1 - p)) & 1 else left[node]
+
+    def lookup(self, key, plen=None):
+        """
+        :return: value of the longest prefix that contains key/plen, or -1
+        """
+        w = self.width
+        if plen is None:
+            plen = w
+
+        # same walk as above, inlined as this is the hot path
+        prefix, plens, left, right, value = self.prefix, self.plen, self.left, self.right, self.value
+        best = -1
+        node = 0
+
+        while node != -1:
+            p = plens[node]
+            if p > plen or (p and (prefix[node] ^ key) >> (w - p)):
+                break
+
+            if value[node] != -1:
+                best = value[node]
+
+            if p == w:
+                break
+
+            node = right[node] if (key >> (w - 1 - p)) & 1 else left[node]
+
+        return best
+
+
+def _parse(addr):
+    """
+    :return: (version, int, prefix length)
+    """
+    if isinstance(addr, int):
+        return (4, addr, 32) if addr <= 0xffffffff else (6, addr, 128)
+
+    if ':' not in addr:
+        a, _, plen = addr.partition('/')
+        try:
+            a = _ipv4.unpack(socket.inet_pton(socket.AF_INET, a))[0]
+            plen = int(plen) if plen else 32
+        except (OSError, ValueError):
+            pass
+        else:
+            if 0 <= plen <= 32:
+                return 4, a, plen
+
+    n = ipaddress.ip_network(addr, strict=False)
+    return n.version, int(n.network_address), n.prefixlen
+
+
+class IPMatcher(Matcher):
+    """
+    Longest-prefix matcher for ipv4 and ipv6 feeds
+
+        m = IPMatcher(cli.feed({'itype': 'ipv4', 'confidence': 8}))
+        m.match('192.0.2.1')            # records for the most specific listed prefix
+        m.match_all('192.0.2.1')        # records for every listed prefix covering the address
+        m.match_many(['192.0.2.1', ..]) # one result per address
+
+    Records are the indicator dicts handed to add(), several records (eg: different providers) can share a
+    prefix.
+    """
+
+    def __init__(self, indicators=None):
+        self.trees = {4: _Tree(32), 6: _Tree(128)}
+        self.records = []
+
+        if indicators:
+            self.update(indicators)
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, indicator, record=None):
+        """
+        :param indicator: address or cidr, eg: 192.0.2.0/24
+        :param record: what to return on a match, defaults to the indicator
+        """
+        if record is None:
+            record = indicator
+
+        try:
+            v, key, plen = _parse(indicator)
+        except ValueError:
+            logger.debug('skipping: %s' % indicator)
+            return False
+
+        i = self.trees[v].insert(key, plen, len(self.records))
+        if i == len(self.records):
+            self.records.append([record])
+        else:
+            self.records[i].append(record)
+
+        return True
+
+    def match(self, addr):
+        """
+        :param addr: address (str or int) or cidr, a cidr matches prefixes that contain all of it
+        :return: list of records for the longest matching prefix, or None
+        """
+        try:
+            v, key, plen = _parse(addr)
+        except ValueError:
+            return None
+
+        i = self.trees[v].lookup(key, plen)
+        if i == -1:
+            return None
+
+        return self.records[i]
+
+    def match_all(self, addr):
+        """
+        :return: records for every listed prefix that contains addr, least specific first
+        """
+        try:
+            v, key, plen = _parse(addr)
+        except ValueError:
+            return []
+
+        rv = []
+        for i in self.trees[v].walk(key, plen):
+            rv.extend(self.records[i])
+
+        return rv
+
+    def match_many(self, addrs):
+        """
+        :param addrs: iterable of addresses (str or int), eg: a column of flow records
+        :return: list with the match() result for each address
+        """
+        v4 = self.trees[4]
+        lookup = v4.lookup
+        unpack = _ipv4.unpack
+        pton = socket.inet_pton
+        records = self.records
+
+        rv = []
+        for a in addrs:
+            # inline the common case, a bare ipv4 address
+            if isinstance(a, str) and ':' not in a and '/' not in a:
+                try:
+                    i = lookup(unpack(pton(socket.AF_INET, a))[0])
+                except OSError:
+                    rv.append(None)
+                    continue
+
+                rv.append(None if i == -1 else records[i])
+            else:
+                rv.append(self.match(a))
+
+        return rv
+
+    def __contains__(self, addr):
+        return self.match(addr) is not None
@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+import arrow
+
+from cifsdk.constants import RUNTIME_PATH, FEED_LIMIT
+from cifsdk.client.plugin import filters_key
+from cifsdk.utils.zarrow import epoch
+from cifsdk.utils.zjson import default
+
+STORE_PATH = os.getenv('CIF_STORE_PATH', os.path.join(RUNTIME_PATH, 'cifsdk-store.sqlite'))
+
+# leave a buffer for things that are being generated "now", same as cif-tail
+SYNC_BUFFER = 120
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS indicators (
+    id INTEGER PRIMARY KEY,
+    indicator TEXT NOT NULL,
+    provider TEXT NOT NULL DEFAULT '',
+    itype TEXT,
+    confidence REAL,
+    reporttime INTEGER,
+    data TEXT NOT NULL,
+    UNIQUE (indicator, provider)
+);
+CREATE INDEX IF NOT EXISTS indicators_itype ON indicators (itype, confidence);
+CREATE INDEX IF NOT EXISTS indicators_reporttime ON indicators (reporttime);
+
+CREATE TABLE IF NOT EXISTS tags (
+    indicator_id INTEGER NOT NULL REFERENCES indicators(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, indicator_id)
+);
+CREATE INDEX IF NOT EXISTS tags_indicator ON tags (indicator_id);
+
+CREATE TABLE IF NOT EXISTS feeds (
+    key TEXT PRIMARY KEY,
+    hwm INTEGER NOT NULL
+);
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class Store(object):
+    """
+    Local, indexed mirror of one or more feeds in SQLite, keyed by indicator + provider.
+
+        s = Store(client=HTTP(remote, token))
+        s.sync({'itype': 'ipv4', 'tags': 'scanner', 'confidence': 8})
+        s.search({'indicator': '192.0.2.1'})
+
+    sync() pulls incrementally, each feed remembers the highest reporttime it has seen (its high-water mark) and
+    only asks for what was reported after it, search() is answered locally.
+    """
+
+    def __init__(self, path=STORE_PATH, client=None):
+        self.path = path
+        self.client = client
+        self._lock = threading.Lock()
+
+        self.handle = sqlite3.connect(path, check_same_thread=False)
+        self.handle.row_factory = sqlite3.Row
+        self.handle.execute('PRAGMA foreign_keys = ON')
+        self.handle.execute('PRAGMA journal_mode = WAL')
+        self.handle.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.handle.close()
+
+    def _feed_key(self, filters):
+        f = {k: v for k, v in filters.items() if k not in ['reporttime', 'limit', 'sort', 'days', 'hours']}
+        return json.dumps(filters_key(f))
+
+    def hwm(self, filters):
+        r = self.handle.execute('SELECT hwm FROM feeds WHERE key = ?', (self._feed_key(filters),)).fetchone()
+        if r:
+            return r[0]
+
+    def upsert(self, indicators):
+        """
+        Insert or update indicators, newer reporttimes win
+
+        :param indicators: iterable of indicator dicts
+        :return: number of indicators processed, highest reporttime seen (epoch)
+        """
+        n = 0
+        hwm = None
+
+        with self._lock, self.handle:
+            c = self.handle.cursor()
+            for i in indicators:
+                rt = epoch(i.get('reporttime'))
+                if rt is not None and (hwm is None or rt > hwm):
+                    hwm = rt
+
+                tags = i.get('tags') or []
+                if isinstance(tags, str):
+                    tags = tags.split(',')
+
+                provider = i.get('provider') or ''
+                r = c.execute('SELECT id, reporttime FROM indicators WHERE indicator = ? AND provider = ?',
+                              (i['indicator'], provider)).fetchone()
+
+                if r and r['reporttime'] is not None and rt is not None and r['reporttime'] > rt:
+                    continue
+
+                data = json.dumps(i, default=default)
+                if r:
+                    c.execute('UPDATE indicators SET itype = ?, confidence = ?, reporttime = ?, data = ? '
+                              'WHERE id = ?', (i.get('itype'), i.get('confidence'), rt, data, r['id']))
+                    id = r['id']
+                    c.execute('DELETE FROM tags WHERE indicator_id = ?', (id,))
+                else:
+                    c.execute('INSERT INTO indicators (indicator, provider, itype, confidence, reporttime, data) '
+                              'VALUES (?, ?, ?, ?, ?, ?)',
+                              (i['indicator'], provider, i.get('itype'), i.get('confidence'), rt, data))
+                    id = c.lastrowid
+
+                c.executemany('INSERT OR IGNORE INTO tags (indicator_id, tag) VALUES (?, ?)',
+                              [(id, t.strip()) for t in tags if t.strip()])
+                n += 1
+
+        return n, hwm
+
+    def _set_hwm(self, filters, hwm):
+        with self._lock, self.handle:
+            self.handle.execute('INSERT OR REPLACE INTO feeds (key, hwm) VALUES (?, ?)',
+                                (self._feed_key(filters), hwm))
+
+    def _pull(self, filters):
+        if hasattr(self.client, 'feed_iter'):
+            return self.client.feed_iter(filters)
+
+        return self.client.feed(filters)
+
+    def sync(self, filters, start=None, limit=FEED_LIMIT):
+        """
+        Pull everything reported since this feed's high-water mark (or `start` on the first sync) up to now
+
+        Rows are asked for oldest first, `limit` at a time. A short page means the window is complete and the mark
+        moves to its end, a full page may have been cut off by the limit so the mark only moves up to the newest
+        row in it and the next page carries on from there.
+
+        :param filters: feed filters (itype, tags, confidence, ..)
+        :param start: epoch or timestamp to start from when the feed has never been synced
+        :param limit: rows per page
+        :return: number of indicators pulled
+        """
+        if self.client is None:
+            raise RuntimeError('a client is required to sync')
+
+        hwm = self.hwm(filters)
+        if hwm is not None:
+            start = hwm + 1
+        elif start is not None:
+            start = epoch(start)
+
+        end = arrow.utcnow().int_timestamp - SYNC_BUFFER
+
+        f = dict(filters)
+        for k in ['days', 'hours']:
+            f.pop(k, None)
+
+        limit = int(f.get('limit') or limit)
+        f['limit'] = limit
+        f['sort'] = 'reporttime'
+
+        total = 0
+        while True:
+            if start is not None:
+                if start > end:
+                    break
+
+                f['reporttime'] = '{},{}'.format(arrow.get(start).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                                 arrow.get(end).strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+            logger.debug('syncing %s' % f)
+            rows = [0]
+
+            def _count(indicators):
+                for i in indicators:
+                    rows[0] += 1
+                    yield i
+
+            n, seen = self.upsert(_count(self._pull(f)))
+            total += n
+
+            if rows[0] < limit:
+                # the whole window came back, no need to re-ask for it next time, even if it was empty
+                hwm = end if start is not None else seen
+                if hwm:
+                    self._set_hwm(filters, hwm)
+
+                break
+
+            if seen is None or (start is not None and seen <= start):
+                logger.warning('more than %i rows reported at %s, raise the limit to sync past it' % (limit, seen))
+                if start is not None:
+                    self._set_hwm(filters, start - 1)
+
+                break
+
+            # rows sharing the newest second may have been cut off, ask for that second again
+            self._set_hwm(filters, seen - 1)
+            start = seen
+
+        return total
+
+    def search(self, filters={}):
+        """
+        :param filters: indicator, itype, tags (str or list, any of), confidence (minimum), reporttime (start
+                        or 'start,end'), provider, limit
+        :return: list of indicator dicts
+        """
+        sql = ['SELECT i.data FROM indicators i']
+        where = []
+        args = []
+
+        if filters.get('tags'):
+            tags = filters['tags']
+            if isinstance(tags, str):
+                tags = tags.split(',')
+
+            where.append('i.id IN (SELECT indicator_id FROM tags WHERE tag IN (%s))' % ','.join('?' * len(tags)))
+            args.extend(tags)
+
+        for k in ['indicator', 'itype', 'provider']:
+            if filters.get(k):
+                where.append('i.%s = ?' % k)
+                args.append(filters[k])
+
+        if filters.get('confidence') is not None:
+            where.append('i.confidence >= ?')
+            args.append(float(filters['confidence']))
+
+        if filters.get('reporttime'):
+            start, _, end = str(filters['reporttime']).partition(',')
+            where.append('i.reporttime >= ?')
+            args.append(epoch(start))
+            if end:
+                where.append('i.reporttime <= ?')
+                args.append(epoch(end))
+
+        if where:
+            sql.append('WHERE ' + ' AND '.join(where))
+
+        sql.append('ORDER BY i.reporttime DESC')
+
+        if filters.get('limit'):
+            sql.append('LIMIT ?')
+            args.append(int(filters['limit']))
+
+        with self._lock:
+            return [json.loads(r[0]) for r in self.handle.execute(' '.join(sql), args)]
+
+    def __len__(self):
+        return self.handle.execute('SELECT COUNT(*) FROM indicators').fetchone()[0]
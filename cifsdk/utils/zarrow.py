@@ -1,10 +1,56 @@
 import arrow
 import datetime
+import functools
+import os
 import re
+from dateutil import tz
 from pprint import pprint
 
+UTC = tz.tzutc()
+
+TIMESTAMP_CACHE_SIZE = os.getenv('CIFSDK_TIMESTAMP_CACHE_SIZE', 4096)
+
+# YYYY-MM-DD, optionally followed by [T ]HH:MM:SS[.fraction] and a UTC designator
+RE_ISO = re.compile(r'(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6})\d*)?(?:Z|[+-]00:?00)?)?')
+
+
+def _fast(ts):
+    """
+    Parse the formats we see on nearly every row without going through arrow's parser
+
+    :return: Arrow, or None if ts isn't one of the common formats
+    """
+    n = len(ts)
+
+    if n in (8, 10, 14) and ts.isascii() and ts.isdigit():
+        if n == 10:
+            return arrow.Arrow.utcfromtimestamp(int(ts))
+
+        t = (int(ts[0:4]), int(ts[4:6]), int(ts[6:8]))
+        if n == 14:
+            t += (int(ts[8:10]), int(ts[10:12]), int(ts[12:14]))
+
+    else:
+        m = RE_ISO.fullmatch(ts)
+        if m is None:
+            return None
+
+        y, mo, d, h, mi, s, f = m.groups()
+        t = (int(y), int(mo), int(d))
+        if h is not None:
+            t += (int(h), int(mi), int(s), int(f.ljust(6, '0')) if f else 0)
+
+    if t[0] < 1980:
+        raise RuntimeError('invalid timestamp: %s' % ts)
 
-def parse_timestamp(ts):
+    try:
+        return arrow.Arrow(*t, tzinfo=UTC)
+    except ValueError:
+        # eg: month 13, let arrow produce the error
+        return None
+
+
+def _parse_timestamp(ts):
     try:
         t = arrow.get(ts)
         if t.year < 1980:
@@ -23,7 +69,7 @@ def parse_timestamp(ts):
             t = arrow.get(ts, 'X')
             return t
         if len(ts) == 14:
-            match = re.search('^(\d{4})(\d{2})(\d{2})(\d{2})(\d{2})(\d{2})$', ts)
+            match = re.search(r'^(\d{4})(\d{2})(\d{2})(\d{2})(\d{2})(\d{2})$', ts)
             if match:
                 ts = '{}-{}-{}T{}:{}:{}Z'.format(match.group(1), match.group(2), match.group(3), match.group(4),
                                                  match.group(5), match.group(6))
@@ -35,3 +81,69 @@ def parse_timestamp(ts):
             raise RuntimeError('Invalid Timestamp: %s' % ts)
     else:
         raise RuntimeError('Invalid Timestamp: %s' % ts)
+
+
+def parse_timestamp(ts):
+    if isinstance(ts, str):
+        t = _fast(ts)
+        if t is not None:
+            return t
+
+    return _parse_timestamp(ts)
+
+
+def parse_timestamps(ts):
+    """
+    :param ts: iterable of timestamps
+    :return: list of Arrow objects
+    """
+    fast = _fast
+    slow = _parse_timestamp
+
+    rv = []
+    for t in ts:
+        a = fast(t) if isinstance(t, str) else None
+        rv.append(slow(t) if a is None else a)
+
+    return rv
+
+
+def cached_parser(maxsize=TIMESTAMP_CACHE_SIZE):
+    """
+    Feed rows from the same provider batch tend to share their reporttime/firsttime strings, an LRU in front of
+    parse_timestamp skips re-parsing them. Arrow objects are immutable so handing out the same one is safe.
+
+    :param maxsize: number of distinct timestamps to remember
+    :return: parse_timestamp wrapped in an LRU cache (see .cache_info() and .cache_clear())
+    """
+    return functools.lru_cache(maxsize=int(maxsize))(parse_timestamp)
+
+
+parse_timestamp_cached = cached_parser()
+
+
+def epoch(ts):
+    """
+    :param ts: timestamp, or epoch seconds which are passed through
+    :return: epoch seconds, None for an empty timestamp
+    """
+    if ts is None or ts == '':
+        return None
+
+    if isinstance(ts, int):
+        return ts
+
+    return parse_timestamp_cached(ts).int_timestamp
+
+
+def timestamp_cache_stats(parser=None):
+    """
+    :param parser: a parser from cached_parser(), defaults to parse_timestamp_cached
+    """
+    i = (parser or parse_timestamp_cached).cache_info()
+    return {
+        'hits': i.hits,
+        'misses': i.misses,
+        'size': i.currsize,
+        'maxsize': i.maxsize,
+    }
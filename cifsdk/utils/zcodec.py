@@ -0,0 +1,150 @@
+import logging
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+def available():
+    """
+    Content-Encodings we can handle, in order of preference
+    """
+    rv = []
+    if zstandard is not None:
+        rv.append('zstd')
+
+    rv.extend(['gzip', 'deflate'])
+    return rv
+
+
+def accept_encoding(codecs=None):
+    if codecs is None:
+        codecs = available()
+
+    if isinstance(codecs, str):
+        codecs = [c.strip() for c in codecs.split(',')]
+
+    for c in codecs:
+        if c not in available():
+            raise ValueError('unsupported codec: %s' % c)
+
+    return ', '.join(codecs)
+
+
+def compress(data, codec='deflate', level=None):
+    """
+    :param data: bytes
+    :param codec: deflate, gzip or zstd
+    :param level: compression level, None for the codec's default
+    :return: bytes
+    """
+    if codec == 'deflate':
+        return zlib.compress(data, -1 if level is None else level)
+
+    if codec == 'gzip':
+        c = zlib.compressobj(-1 if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return c.compress(data) + c.flush()
+
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError('zstd requires the zstandard module')
+
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+    raise ValueError('unsupported codec: %s' % codec)
+
+
+class Decompressor(object):
+    """
+    Incremental decompressor for a Content-Encoding, keeps track of the bytes in and out so we can report
+    compression ratios
+    """
+
+    def __init__(self, codec=None):
+        self.codec = (codec or 'identity').strip().lower()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        if self.codec == 'deflate':
+            self._obj = zlib.decompressobj()
+            self._first = True
+
+        elif self.codec in ['gzip', 'x-gzip']:
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        elif self.codec == 'zstd':
+            if zstandard is None:
+                raise ValueError('zstd requires the zstandard module')
+
+            self._obj = zstandard.ZstdDecompressor().decompressobj()
+
+        elif self.codec == 'identity':
+            self._obj = None
+
+        else:
+            raise ValueError('unsupported codec: %s' % codec)
+
+    @property
+    def ratio(self):
+        if not self.bytes_in:
+            return 0.0
+
+        return float(self.bytes_out) / self.bytes_in
+
+    def decompress(self, data):
+        if not data:
+            return b''
+
+        self.bytes_in += len(data)
+
+        if self._obj is None:
+            rv = data
+
+        elif self.codec == 'deflate' and self._first:
+            # some servers send raw deflate streams rather than zlib wrapped ones
+            self._first = False
+            try:
+                rv = self._obj.decompress(data)
+            except zlib.error:
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+                rv = self._obj.decompress(data)
+
+        else:
+            rv = self._obj.decompress(data)
+
+        self.bytes_out += len(rv)
+        return rv
+
+    def flush(self):
+        if self._obj is None or not hasattr(self._obj, 'flush'):
+            return b''
+
+        rv = self._obj.flush()
+        self.bytes_out += len(rv)
+        return rv
+
+
+def iter_decompress(chunks, codec=None):
+    """
+    Decompress an iterable of byte chunks as they arrive
+
+    :param chunks: iterable of bytes
+    :param codec: Content-Encoding of the chunks
+    :return: generator of decompressed bytes
+    """
+    d = Decompressor(codec)
+
+    for c in chunks:
+        c = d.decompress(c)
+        if c:
+            yield c
+
+    c = d.flush()
+    if c:
+        yield c
+
+    logger.debug('%s: %i bytes in, %i bytes out (%.1fx)' % (d.codec, d.bytes_in, d.bytes_out, d.ratio))
@@ -0,0 +1,154 @@
+import base64
+import codecs
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+
+class _Buffer(object):
+    """
+    Accumulates decoded text from an iterable of byte chunks, dropping what has
+    already been consumed so only the current element is held in memory.
+    """
+
+    def __init__(self, chunks, encoding='utf-8'):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+        for chunk in self.chunks:
+            if not chunk:
+                continue
+
+            if isinstance(chunk, bytes):
+                chunk = self.decoder.decode(chunk)
+
+            self.buf += chunk
+            return True
+
+        self.buf += self.decoder.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def skip_ws(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def peek(self):
+        self.skip_ws()
+        if self.pos >= len(self.buf):
+            raise ValueError('unexpected end of json stream')
+
+        return self.buf[self.pos]
+
+    def expect(self, c):
+        if self.peek() != c:
+            raise ValueError('expected %r at position %i' % (c, self.pos))
+
+        self.pos += 1
+
+    def value(self):
+        self.skip_ws()
+        while True:
+            try:
+                v, end = _decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+
+            # scalars (eg: numbers) can decode from a truncated buffer, make sure the next token is here
+            if end >= len(self.buf) and not self.eof and self.buf[self.pos] not in '{["':
+                self.fill()
+                continue
+
+            self.pos = end
+            return v
+
+
+def iter_array(chunks, key='data', meta=None):
+    """
+    Incrementally parse a json document from an iterable of byte (or str) chunks and yield
+    the elements of the array stored under the top-level key one at a time.
+
+    If the value stored under the key is not an array, it is yielded as a single element.
+
+    :param chunks: iterable of bytes or str, eg: requests.Response.iter_content()
+    :param key: top-level key holding the array
+    :param meta: optional dict, filled with the remaining top-level keys (eg: status, message)
+    :return: generator of decoded elements
+    """
+    b = _Buffer(chunks)
+
+    b.expect('{')
+    if b.peek() == '}':
+        return
+
+    while True:
+        k = b.value()
+        b.expect(':')
+
+        if k != key:
+            v = b.value()
+            if meta is not None:
+                meta[k] = v
+
+        elif b.peek() != '[':
+            yield b.value()
+
+        else:
+            b.pos += 1
+            if b.peek() == ']':
+                b.pos += 1
+            else:
+                while True:
+                    yield b.value()
+
+                    c = b.peek()
+                    b.pos += 1
+                    if c == ']':
+                        break
+
+                    if c != ',':
+                        raise ValueError('expected "," or "]" in array')
+
+        c = b.peek()
+        b.pos += 1
+        if c == '}':
+            return
+
+        if c != ',':
+            raise ValueError('expected "," or "}" in object')
+
+
+def default(o):
+    """
+    json.dumps(default=) hook for the bytes we put into indicators ourselves, eg: the 'message' field the http
+    client base64 decodes. Text comes back out as text, anything else is base64 encoded again.
+    """
+    if isinstance(o, (bytes, bytearray)):
+        try:
+            return o.decode('utf-8')
+        except UnicodeDecodeError:
+            return base64.b64encode(o).decode('ascii')
+
+    raise TypeError('Object of type %s is not JSON serializable' % type(o).__name__)
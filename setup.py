@@ -56,6 +56,11 @@ setup(
         'msgpack-python>=0.4.8,<0.5.0',
         'ujson'
     ],
+    extras_require={
+        'async': ['httpx'],
+        'zstd': ['zstandard'],
+        'arrow': ['pyarrow'],
+    },
     scripts=[],
     entry_points={
         'console_scripts': [
@@ -0,0 +1,51 @@
+"""
+Compare the fast path in cifsdk.utils.zarrow against arrow's parser
+
+    $ python -m test.bench_timestamps
+"""
+import random
+import sys
+import timeit
+
+import arrow
+
+from cifsdk.utils.zarrow import parse_timestamps, _parse_timestamp
+
+N = 20000
+SPEEDUP = 10
+
+
+def _sample(n):
+    random.seed(1)
+    now = arrow.utcnow().int_timestamp
+    rv = []
+    for _ in range(n):
+        t = arrow.get(now - random.randint(0, 86400 * 365))
+        rv.append(random.choice([
+            t.format('YYYY-MM-DDTHH:mm:ss') + 'Z',
+            t.format('YYYY-MM-DDTHH:mm:ss.SSSSSS') + 'Z',
+            t.format('YYYY-MM-DD'),
+            t.format('YYYYMMDD'),
+            t.format('YYYYMMDDHHmmss'),
+            str(t.int_timestamp),
+        ]))
+
+    return rv
+
+
+def main():
+    ts = _sample(N)
+
+    slow = min(timeit.repeat(lambda: [_parse_timestamp(t) for t in ts], number=1, repeat=3))
+    fast = min(timeit.repeat(lambda: parse_timestamps(ts), number=1, repeat=3))
+
+    print('arrow:     %8.0f/s' % (N / slow))
+    print('fast path: %8.0f/s' % (N / fast))
+    print('speedup:   %8.1fx' % (slow / fast))
+
+    if slow / fast < SPEEDUP:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,3 +15,48 @@ def test_client_dummy():
 
     assert cli.indicators_search(data)
 
+
+
+def test_client_export_bloom(tmpdir):
+    from cifsdk.client.client import export_feed
+    from cifsdk.match.bloom import BloomFilter
+
+    class _Client(object):
+        def feed_iter(self, filters):
+            return iter([{'indicator': 'example.com'}, {'indicator': '192.0.2.1'}])
+
+    p = str(tmpdir.join('feed.bloom'))
+    export_feed(_Client(), {'itype': 'fqdn'}, 'bloom', output=p, error_rate=0.01)
+
+    b = BloomFilter.load(p)
+    assert b.contains_many(['example.com', '192.0.2.1']) == [True, True]
+
+    with py.test.raises(ValueError):
+        export_feed(_Client(), {}, 'nope')
+
+
+def test_client_diff_feed(tmpdir):
+    import json
+    from cifsdk.client.client import diff_feed
+
+    class _Client(object):
+        data = [{'indicator': 'example.com'}, {'indicator': '192.0.2.1'}]
+
+        def feed_iter(self, filters):
+            return iter(self.data)
+
+    snapshot = str(tmpdir.join('feed.snapshot'))
+    out = str(tmpdir.join('out.json'))
+    c = _Client()
+
+    assert diff_feed(c, {}, snapshot, output=out) == 2
+
+    c.data = [{'indicator': 'example.com'}, {'indicator': 'example.org', 'message': b'hello'}]
+    assert diff_feed(c, {}, snapshot, output=out) == 2
+
+    with open(out) as f:
+        rv = [json.loads(l) for l in f]
+
+    assert sorted((r['action'], r['data']['indicator']) for r in rv) == \
+        [('added', 'example.org'), ('removed', '192.0.2.1')]
+    assert [r['data']['message'] for r in rv if r['action'] == 'added'] == ['hello']
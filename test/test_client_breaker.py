@@ -0,0 +1,100 @@
+import py.test
+
+from cifsdk.client.breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from cifsdk.client.http import HTTP
+from cifsdk.exceptions import CIFBusy, CircuitOpen, AuthError
+
+
+def test_client_breaker():
+    now = [0]
+    b = CircuitBreaker(threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    b.allow()
+    b.failure()
+    assert b.state == CLOSED
+
+    b.failure()
+    assert b.state == OPEN
+    with py.test.raises(CircuitOpen):
+        b.allow()
+
+    now[0] = 10
+    assert b.state == HALF_OPEN
+    b.allow()
+
+    # only one trial call at a time
+    with py.test.raises(CircuitOpen):
+        b.allow()
+
+    b.failure()
+    assert b.state == OPEN
+
+    now[0] = 20
+    b.allow()
+    b.success()
+    assert b.state == CLOSED
+
+
+def test_client_breaker_http():
+    from test.test_client_http import _response
+    from cifsdk.client.retry import RetryPolicy
+
+    calls = []
+
+    def _get(*args, **kwargs):
+        calls.append(args)
+        return _response(b'', status_code=503)
+
+    cli = HTTP('https://localhost:3000', '12345', circuit_breaker=CircuitBreaker(threshold=3),
+               retry_policy=RetryPolicy(retries=0))
+    cli.session.get = _get
+
+    for _ in range(3):
+        with py.test.raises(CIFBusy):
+            cli.indicators_search({'indicator': 'example.com'})
+
+    with py.test.raises(CircuitOpen):
+        cli.indicators_search({'indicator': 'example.com'})
+
+    assert len(calls) == 3
+
+
+def test_client_breaker_success():
+    from test.test_client_http import _response
+
+    cli = HTTP('https://localhost:3000', '12345', circuit_breaker=True)
+    cli.session.get = lambda *args, **kwargs: _response(b'', status_code=401)
+
+    for _ in range(10):
+        with py.test.raises(AuthError):
+            cli.indicators_search({'indicator': 'example.com'})
+
+    assert cli.circuit_breaker.state == CLOSED
+
+
+def test_client_breaker_cancelled():
+    import asyncio
+    from cifsdk.client.plugin import Client
+
+    now = [0]
+    cli = Client('https://localhost:3000', '12345',
+                 circuit_breaker=CircuitBreaker(threshold=1, reset_timeout=10, clock=lambda: now[0]))
+    cli.circuit_breaker.failure()
+
+    now[0] = 10
+
+    async def _trial():
+        with cli._circuit():
+            await asyncio.sleep(10)
+
+    async def _main():
+        with py.test.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(_trial(), 0.01)
+
+    asyncio.run(_main())
+
+    # the abandoned trial doesn't wedge the breaker
+    assert cli.circuit_breaker.state == HALF_OPEN
+    cli.circuit_breaker.allow()
+    cli.circuit_breaker.success()
+    assert cli.circuit_breaker.state == CLOSED
@@ -0,0 +1,65 @@
+import py.test
+
+from cifsdk.client.cached import CachedClient
+from cifsdk.client.dummy import Dummy
+
+
+class _Client(Dummy):
+    def __init__(self, *args):
+        super(_Client, self).__init__(*args)
+        self.calls = 0
+
+    def indicators_search(self, filters, **kwargs):
+        self.calls += 1
+        if filters['indicator'] == 'unknown.com':
+            return []
+
+        return [{'indicator': filters['indicator']}]
+
+
+def test_client_cached():
+    now = [0]
+    c = _Client('https://localhost:3000', '12345')
+    cli = CachedClient(c, maxsize=2, ttl=10, negative_ttl=5, clock=lambda: now[0])
+
+    for _ in range(5):
+        assert cli.indicators_search({'indicator': 'example.com', 'tags': ['a', 'b']}) == [{'indicator': 'example.com'}]
+        assert cli.search({'tags': ['b', 'a'], 'indicator': 'example.com', 'limit': None}) == \
+            [{'indicator': 'example.com'}]
+        assert cli.indicators_search({'indicator': 'unknown.com'}) == []
+
+    assert c.calls == 2
+    assert cli.stats() == {'hits': 13, 'negative_hits': 4, 'misses': 2, 'size': 2, 'maxsize': 2}
+
+    # negative entries expire first
+    now[0] = 6
+    cli.indicators_search({'indicator': 'unknown.com'})
+    cli.indicators_search({'indicator': 'example.com', 'tags': ['a', 'b']})
+    assert c.calls == 3
+
+    # lru
+    cli.indicators_search({'indicator': 'example.org'})
+    assert cli.stats()['size'] == 2
+    cli.indicators_search({'indicator': 'unknown.com'})
+    assert c.calls == 5
+
+    # pass through
+    assert cli.ping()
+
+
+def test_client_cached_search_many():
+    c = _Client('https://localhost:3000', '12345')
+    cli = CachedClient(c, maxsize=10, ttl=10, negative_ttl=5)
+
+    for _ in range(2):
+        assert cli.indicators_search_many(['a.com', 'b.com', 'unknown.com']) == {
+            'a.com': [{'indicator': 'a.com'}], 'b.com': [{'indicator': 'b.com'}], 'unknown.com': []}
+
+    assert c.calls == 3
+    assert cli.stats()['hits'] == 3
+    assert cli.stats()['misses'] == 3
+
+    # shares entries with indicators_search
+    assert cli.indicators_search({'indicator': 'a.com'}) == [{'indicator': 'a.com'}]
+    cli.indicators_search_many(['a.com', 'c.com'], workers=2)
+    assert c.calls == 4
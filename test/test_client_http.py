@@ -8,3 +8,158 @@ def test_client_http():
     assert cli.remote == 'https://localhost:3000'
 
     assert cli.token == '12345'
+
+
+def _response(body, status_code=200, headers={}):
+    from io import BytesIO
+    from requests.models import Response
+
+    resp = Response()
+    resp.status_code = status_code
+    resp.headers.update(headers)
+    resp.raw = BytesIO(body)
+    return resp
+
+
+def test_client_http_feed_iter():
+    import json
+
+    data = [{'indicator': '192.168.1.%i' % n, 'itype': 'ipv4', 'tags': ['scanner']} for n in range(100)]
+    body = json.dumps({'status': 'success', 'message': 'ok', 'data': data}).encode('utf-8')
+
+    cli = Client('https://localhost:3000', '12345')
+    cli.session.get = lambda *args, **kwargs: _response(body)
+
+    rv = cli.feed_iter({'itype': 'ipv4'})
+    assert not isinstance(rv, list)
+    assert list(rv) == data
+
+    rv = cli.feed_table({'itype': 'ipv4'})
+    assert len(rv) == 100
+    assert rv[99]['indicator'] == '192.168.1.99'
+
+
+def test_client_http_feed_iter_chunks():
+    from cifsdk.utils.zjson import iter_array
+
+    body = b'{"message": "ok", "data": [{"indicator": "\xc3\xa9xample.com", "confidence": 8}, 1234, [1, 2]], ' \
+           b'"status": "success"}'
+
+    meta = {}
+    chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+    assert list(iter_array(chunks, meta=meta)) == [{'indicator': u'\xe9xample.com', 'confidence': 8}, 1234, [1, 2]]
+    assert meta == {'message': 'ok', 'status': 'success'}
+
+    assert list(iter_array([b'{"data": []}'])) == []
+    assert list(iter_array([b'{"data": "{}"}'])) == ['{}']
+
+
+def test_client_http_indicators_create_bulk():
+    import json
+    import zlib
+    import threading
+
+    lock = threading.Lock()
+    posted = []
+
+    def _post(uri, data=None, **kwargs):
+        batch = json.loads(zlib.decompress(data))
+        with lock:
+            posted.append(len(batch))
+
+        if batch[0]['indicator'] == 'example0.com':
+            return _response(b'{"message": "invalid indicator"}', status_code=422)
+
+        return _response(json.dumps({'data': len(batch)}).encode('utf-8'), status_code=201)
+
+    cli = Client('https://localhost:3000', '12345')
+    cli.session.post = _post
+
+    data = ({'indicator': 'example%i.com' % n, 'tags': ['botnet']} for n in range(1050))
+    rv = cli.indicators_create_bulk(data, batch_size=100, workers=3)
+
+    assert sorted(posted) == [50] + [100] * 10
+    assert [r['batch'] for r in rv['results']] == list(range(1, 11))
+    assert sum(r['data'] for r in rv['results']) == 950
+    assert len(rv['failures']) == 1
+    assert rv['failures'][0]['batch'] == 0
+    assert rv['failures'][0]['count'] == 100
+
+
+def test_client_http_retry():
+    from cifsdk.client.retry import RetryPolicy
+    from cifsdk.exceptions import CIFBusy
+
+    slept = []
+    resps = [
+        _response(b'', status_code=503, headers={'Retry-After': '7'}),
+        _response(b'', status_code=502),
+        _response(b'{"status": "success", "data": []}', headers={'Content-Length': '33'}),
+    ]
+
+    policy = RetryPolicy(retries=3, base=1, cap=4, sleep=slept.append)
+    cli = Client('https://localhost:3000', '12345', retry_policy=policy)
+    cli.session.get = lambda *args, **kwargs: resps.pop(0)
+
+    assert cli.indicators_search({'indicator': 'example.com'}) == []
+    assert slept[0] == 7
+    assert 0 <= slept[1] <= 2
+    assert policy.stats() == {'retries': 2, 'waited': sum(slept)}
+
+    cli.session.get = lambda *args, **kwargs: _response(b'', status_code=429)
+    with py.test.raises(CIFBusy):
+        cli.indicators_search({'indicator': 'example.com'})
+
+    assert policy.stats()['retries'] == 5
+
+
+def test_client_http_retry_budget():
+    from cifsdk.client.retry import RetryPolicy
+
+    policy = RetryPolicy(retries=10, base=1, cap=60, max_elapsed=10)
+    assert policy.delay(0, elapsed=0, retry_after='5') == 5
+    assert policy.delay(1, elapsed=6, retry_after='5') is None
+    assert policy.delay(10, elapsed=0) is None
+    assert 9 < policy.retry_after('Wed, 21 Oct 2099 07:28:00 GMT')
+
+
+def test_client_http_pool():
+    import json
+    import threading
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = json.dumps({'status': 'success', 'data': 'pong'}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    t = threading.Thread(target=server.serve_forever)
+    t.start()
+
+    try:
+        cli = Client('http://127.0.0.1:%i' % server.server_port, '12345', pool_maxsize=32, keepalive=60)
+        assert cli.session.get_adapter(cli.remote)._pool_maxsize == 32
+
+        for _ in range(5):
+            assert cli.ping()
+
+        s = cli.pool_stats()
+        assert s['requests'] == 5
+        assert s['new_connections'] == 1
+        assert s['hits'] == 4
+        assert s['tls_handshakes'] == 0
+        cli.session.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        t.join()
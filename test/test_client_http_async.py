@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from cifsdk.client.http_async import AsyncHTTP as Client
+from cifsdk.exceptions import AuthError
+
+
+def test_client_http_async():
+    cli = Client('https://localhost:3000', '12345')
+    assert cli.remote == 'https://localhost:3000'
+
+    assert cli.token == '12345'
+
+
+def test_client_http_async_search():
+    state = {'inflight': 0, 'max': 0}
+
+    async def handler(request):
+        assert request.headers['Authorization'] == 'Token token=12345'
+        if request.url.params.get('indicator') == 'unauthorized.com':
+            return httpx.Response(401)
+
+        state['inflight'] += 1
+        state['max'] = max(state['max'], state['inflight'])
+        await asyncio.sleep(0.01)
+        state['inflight'] -= 1
+
+        data = [{'indicator': request.url.params['indicator']}]
+        return httpx.Response(200, json={'status': 'success', 'data': data})
+
+    async def run():
+        async with Client('https://localhost:3000', '12345', concurrency=4,
+                          transport=httpx.MockTransport(handler)) as cli:
+            rv = await asyncio.gather(*[cli.indicators_search({'indicator': 'example%i.com' % n, 'nolog': None})
+                                        for n in range(20)])
+
+            many = await cli.indicators_search_many(['example1.com', 'example2.com', 'example1.com'])
+            assert many == {'example1.com': [{'indicator': 'example1.com'}],
+                            'example2.com': [{'indicator': 'example2.com'}]}
+
+            with pytest.raises(AuthError):
+                await cli.indicators_search({'indicator': 'unauthorized.com'})
+
+        return rv
+
+    rv = asyncio.run(run())
+    assert [r[0]['indicator'] for r in rv] == ['example%i.com' % n for n in range(20)]
+    assert state['max'] == 4
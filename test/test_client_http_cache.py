@@ -0,0 +1,61 @@
+import py.test
+import json
+
+from cifsdk.client.http import HTTP as Client
+from cifsdk.client.http_cache import HTTPCache
+from test.test_client_http import _response
+
+
+def test_client_http_cache(tmpdir):
+    data = [{'indicator': 'example%i.com' % n, 'itype': 'fqdn'} for n in range(10)]
+    body = json.dumps({'status': 'success', 'data': data}).encode('utf-8')
+    calls = []
+
+    def _get(uri, headers={}, **kwargs):
+        calls.append(headers)
+        if headers.get('If-None-Match') == '"v1"':
+            return _response(b'', status_code=304)
+
+        return _response(body, headers={'ETag': '"v1"'})
+
+    cache = HTTPCache(path=str(tmpdir), ttl=60)
+    cli = Client('https://localhost:3000', '12345', cache=cache)
+    cli.session.get = _get
+
+    filters = {'itype': 'fqdn', 'tags': ['phishing', 'botnet'], 'confidence': 8, 'provider': None}
+    assert cli.feed(filters) == data
+    assert cli.feed({'confidence': 8, 'tags': ['botnet', 'phishing'], 'itype': 'fqdn'}) == data
+    assert len(calls) == 1
+
+    # stale, revalidate
+    cache.ttl = 0
+    assert cli.feed(filters) == data
+    assert len(calls) == 2
+    assert calls[1]['If-None-Match'] == '"v1"'
+
+    # searches are never cached
+    cli.indicators_search({'indicator': 'example.com'})
+    assert len(calls) == 3
+
+    # other remotes and tokens sharing the cache directory don't see these entries
+    cache.ttl = 60
+    for remote, token in [('https://localhost:3001', '12345'), ('https://localhost:3000', '67890')]:
+        other = Client(remote, token, cache=cache)
+        other.session.get = _get
+        other.feed(filters)
+
+    assert len(calls) == 5
+
+
+def test_client_http_cache_evict(tmpdir):
+    import time
+
+    cache = HTTPCache(path=str(tmpdir), max_size=250)
+
+    for n in range(5):
+        cache.set(cache.key('/feed', {'n': n}), b'x' * 100)
+        time.sleep(0.01)
+
+    assert cache.get(cache.key('/feed', {'n': 0})) is None
+    assert cache.get(cache.key('/feed', {'n': 4}))[1] == b'x' * 100
+    assert len([f for f in tmpdir.listdir() if f.ext == '.json']) == 2
@@ -0,0 +1,76 @@
+import py.test
+import threading
+import time
+
+from cifsdk.client.plugin import Client, filters_key
+
+
+class _Client(Client):
+    def __init__(self, *args, **kwargs):
+        super(_Client, self).__init__(*args, **kwargs)
+        self.calls = 0
+        self.ready = threading.Event()
+
+    def indicators_search(self, filters):
+        self.calls += 1
+        self.ready.wait(5)
+        if filters['indicator'] == 'error.com':
+            raise RuntimeError('boom')
+
+        return [{'indicator': filters['indicator']}]
+
+
+def _search(cli, filters, n=10):
+    rv = []
+
+    def _run():
+        try:
+            rv.append(cli.search(filters))
+        except Exception as e:
+            rv.append(e)
+
+    threads = [threading.Thread(target=_run) for _ in range(n)]
+    for t in threads:
+        t.start()
+
+    # give every thread a chance to join the flight before it lands
+    while len(cli._inflight) == 0:
+        time.sleep(0.01)
+    time.sleep(0.2)
+
+    cli.ready.set()
+    for t in threads:
+        t.join()
+
+    cli.ready.clear()
+    return rv
+
+
+def test_client_filters_key():
+    assert filters_key({'indicator': 'example.com', 'tags': ['b', 'a'], 'limit': None}) == \
+        filters_key({'tags': ['a', 'b'], 'indicator': 'example.com'})
+
+
+def test_client_single_flight():
+    cli = _Client('https://localhost:3000', '12345', coalesce=True)
+
+    rv = _search(cli, {'indicator': 'example.com'})
+    assert cli.calls == 1
+    assert len(rv) == 10
+    assert all(r is rv[0] for r in rv)
+
+    rv = _search(cli, {'indicator': 'error.com'})
+    assert cli.calls == 2
+    assert all(isinstance(r, RuntimeError) for r in rv)
+    assert not cli._inflight
+
+
+def test_client_search_many():
+    cli = _Client('https://localhost:3000', '12345')
+    cli.ready.set()
+
+    indicators = ['example%i.com' % n for n in range(50)]
+    rv = cli.indicators_search_many(indicators + indicators, workers=4, confidence=8)
+
+    assert cli.calls == 50
+    assert rv == {i: [{'indicator': i}] for i in indicators}
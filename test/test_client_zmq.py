@@ -1,6 +1,6 @@
 import py.test
 
-from cifsdk.client.zeromq import Client
+from cifsdk.client.zeromq import Client, ZMQ
 from cifsdk.constants import ROUTER_ADDR
 
 
@@ -9,3 +9,262 @@ def test_client_zmq():
     assert cli.remote == ROUTER_ADDR
 
     assert cli.token == '12345'
+
+
+def _server(ctx, addr, n, drop=0):
+    import json
+    import msgpack
+    import zmq
+
+    s = ctx.socket(zmq.ROUTER)
+    s.bind(addr)
+
+    def run():
+        dropped = 0
+        for _ in range(n + drop):
+            m = s.recv_multipart()
+            if dropped < drop:
+                dropped += 1
+                continue
+
+            id, null, token, mtype, data = m
+            rv = {'status': 'success', 'data': [{'indicator': json.loads(data)['indicator']}]}
+            s.send_multipart([id, null, mtype, json.dumps(rv).encode('utf-8')])
+        s.close()
+
+    import threading
+    t = threading.Thread(target=run)
+    t.start()
+    return t
+
+
+def test_client_zmq_persistent():
+    cli = ZMQ('inproc://test_client_zmq_persistent', '12345', persistent=True)
+    t = _server(cli.context, cli.remote, 10)
+
+    for n in range(10):
+        assert cli.indicators_search({'indicator': 'example%i.com' % n}) == [{'indicator': 'example%i.com' % n}]
+
+    t.join()
+    s = cli.socket
+    assert s is not None and not s.closed
+    cli.close()
+    assert s.closed
+
+
+def test_client_zmq_reconnect():
+    cli = ZMQ('inproc://test_client_zmq_reconnect', '12345', persistent=True, timeout=200, retries=1)
+    t = _server(cli.context, cli.remote, 2, drop=1)
+
+    assert cli.indicators_search({'indicator': 'example.com'}) == [{'indicator': 'example.com'}]
+    assert cli.indicators_search({'indicator': 'example.org'}) == [{'indicator': 'example.org'}]
+
+    t.join()
+    cli.close()
+
+
+def _fireball_server(ctx, addr, n, drop=()):
+    import json
+    import threading
+    import zmq
+
+    s = ctx.socket(zmq.ROUTER)
+    s.bind(addr)
+    state = {'max': 0, 'batches': [], 'indicators': [], 'stop': False}
+
+    def run():
+        queue = []
+        seen = set()
+        received = 0
+        while len(state['batches']) < n and not state['stop']:
+            while s.poll(10):
+                m = s.recv_multipart()
+                if len(m) == 4:
+                    # plain [token, mtype, data] framing, no id to echo
+                    m = [m[0], None, None] + m[1:]
+
+                client_id, id, null, token, mtype, data = m
+
+                # without an id, drop by order of arrival
+                seq = id.split(b'.')[0] if id else str(received).encode('utf-8')
+                received += 1
+                if seq in drop and seq not in seen:
+                    seen.add(seq)
+                    continue
+
+                queue.append(m)
+
+            state['max'] = max(state['max'], len(queue))
+            if queue:
+                client_id, id, null, token, mtype, data = queue.pop(0)
+                state['batches'].append(len(json.loads(data)))
+                state['indicators'].extend(i['indicator'] for i in json.loads(data))
+                state['ids'] = id is not None
+                rv = json.dumps({'status': 'success', 'data': len(json.loads(data))}).encode('utf-8')
+                if id is None:
+                    s.send_multipart([client_id, mtype, rv])
+                else:
+                    s.send_multipart([client_id, id, null, mtype, rv])
+        s.close()
+
+    t = threading.Thread(target=run)
+    t.start()
+    return t, state
+
+
+def test_client_zmq_fireball_window():
+    import json
+    import cifsdk.client.zeromq
+
+    cli = ZMQ('inproc://test_client_zmq_fireball_window', '12345', fireball_window=2)
+    t, state = _fireball_server(cli.context, cli.remote, 10)
+
+    data = [{'indicator': 'example%i.com' % n, 'tags': ['botnet']} for n in range(cifsdk.client.zeromq.FIREBALL_SIZE * 10)]
+    rv = cli.indicators_create(json.dumps(data), fireball=True)
+    t.join()
+
+    assert len(rv) == 10
+    assert state['max'] <= 2
+    assert sum(state['batches']) == len(data)
+
+    # routers that predate the id frame still get the usual framing
+    assert state['ids'] is False
+
+
+def test_client_zmq_fireball_retry():
+    import json
+    from cifsdk.client.zeromq import FIREBALL_SIZE
+
+    cli = ZMQ('inproc://test_client_zmq_fireball_retry', '12345', fireball_window=4, fireball_timeout=200,
+              message_ids=True)
+    t, state = _fireball_server(cli.context, cli.remote, 4, drop=(b'2',))
+
+    data = [{'indicator': 'example%i.com' % n, 'tags': ['botnet']} for n in range(FIREBALL_SIZE * 4)]
+    rv = cli.indicators_create(json.dumps(data), fireball=True)
+    t.join()
+
+    assert [json.loads(r)['data'] for r in rv] == [FIREBALL_SIZE] * 4
+    assert state['ids'] is True
+
+
+def test_client_zmq_fireball_dropped(monkeypatch):
+    import json
+    import cifsdk.client.zeromq
+    from cifsdk.exceptions import TimeoutError
+
+    monkeypatch.setattr(cifsdk.client.zeromq, 'FIREBALL_SIZE', 1)
+    data = [{'indicator': 'i%i' % n, 'tags': ['botnet']} for n in range(3)]
+
+    # without ids the next batch's reply would be taken as the lost one's ack, fail instead
+    cli = ZMQ('inproc://test_client_zmq_fireball_dropped', '12345', fireball_window=2, fireball_timeout=200)
+    t, state = _fireball_server(cli.context, cli.remote, 3, drop=(b'0',))
+
+    with py.test.raises(TimeoutError):
+        cli.indicators_create(json.dumps(data), fireball=True)
+
+    state['stop'] = True
+    t.join()
+    assert 'i0' not in state['indicators']
+
+    # one batch at a time, the one that timed out is the one that was lost
+    cli = ZMQ('inproc://test_client_zmq_fireball_dropped_1', '12345', fireball_window=1, fireball_timeout=200)
+    t, state = _fireball_server(cli.context, cli.remote, 3, drop=(b'0',))
+
+    rv = cli.indicators_create(json.dumps(data), fireball=True)
+    t.join()
+
+    assert len(rv) == 3
+    assert state['indicators'] == ['i0', 'i1', 'i2']
+
+
+def test_client_zmq_fireball_generator():
+    import json
+    from csirtg_indicator import Indicator
+    from cifsdk.client.zeromq import FIREBALL_SIZE
+
+    cli = ZMQ('inproc://test_client_zmq_fireball_generator', '12345')
+    t, state = _fireball_server(cli.context, cli.remote, 3)
+
+    def _indicators():
+        for n in range(FIREBALL_SIZE * 2 + 1):
+            if n % 3 == 0:
+                yield Indicator(indicator='example%i.com' % n, tags=['botnet'])
+            elif n % 3 == 1:
+                yield {'indicator': 'example%i.com' % n, 'tags': ['botnet']}
+            else:
+                yield json.dumps({'indicator': 'example%i.com' % n, 'tags': ['botnet']})
+
+    rv = cli.indicators_create(_indicators(), fireball=True)
+    t.join()
+
+    assert len(rv) == 3
+    assert state['batches'] == [FIREBALL_SIZE, FIREBALL_SIZE, 1]
+
+
+def test_client_zmq_search_many():
+    import json
+    import threading
+    import zmq
+
+    cli = ZMQ('inproc://test_client_zmq_search_many', '12345', fireball_window=8, message_ids=True)
+    s = cli.context.socket(zmq.ROUTER)
+    s.bind(cli.remote)
+
+    def run():
+        for _ in range(20):
+            client_id, id, null, token, mtype, data = s.recv_multipart()
+            f = json.loads(data)
+            assert f['confidence'] == 8
+            rv = {'status': 'success', 'data': [{'indicator': f['indicator']}]}
+            s.send_multipart([client_id, id, null, mtype, json.dumps(rv).encode('utf-8')])
+        s.close()
+
+    t = threading.Thread(target=run)
+    t.start()
+
+    indicators = ['example%i.com' % n for n in range(20)]
+    rv = cli.indicators_search_many(indicators + ['example0.com'], confidence=8)
+    t.join()
+
+    assert rv == {i: [{'indicator': i}] for i in indicators}
+
+
+def test_client_zmq_search_many_out_of_order():
+    import json
+    import threading
+    import zmq
+
+    cli = ZMQ('inproc://test_client_zmq_search_many_out_of_order', '12345', fireball_window=4, message_ids=True)
+    s = cli.context.socket(zmq.ROUTER)
+    s.bind(cli.remote)
+
+    def run():
+        m = [s.recv_multipart() for _ in range(2)]
+        for client_id, id, null, token, mtype, data in reversed(m):
+            rv = {'status': 'success', 'data': [{'indicator': json.loads(data)['indicator']}]}
+            s.send_multipart([client_id, id, null, mtype, json.dumps(rv).encode('utf-8')])
+
+        # a reply without the id can't be matched, it must not be guessed
+        client_id, id, null, token, mtype, data = s.recv_multipart()
+        s.send_multipart([client_id, mtype, json.dumps({'status': 'success', 'data': []}).encode('utf-8')])
+        s.close()
+
+    t = threading.Thread(target=run)
+    t.start()
+
+    assert cli.indicators_search_many(['a.com', 'b.com']) == {'a.com': [{'indicator': 'a.com'}],
+                                                              'b.com': [{'indicator': 'b.com'}]}
+
+    with py.test.raises(RuntimeError):
+        cli.indicators_search_many(['c.com'])
+
+    t.join()
+
+
+def test_client_zmq_search_many_sequential():
+    cli = ZMQ('inproc://test_client_zmq_search_many_sequential', '12345')
+    t = _server(cli.context, cli.remote, 3)
+
+    indicators = ['example%i.com' % n for n in range(3)]
+    assert cli.indicators_search_many(indicators) == {i: [{'indicator': i}] for i in indicators}
+    t.join()
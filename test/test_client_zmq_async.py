@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import pytest
+import zmq
+
+from cifsdk.client.zeromq_async import AsyncZMQ as Client
+from cifsdk.exceptions import TimeoutError
+
+
+def test_client_zmq_async_pipeline():
+    cli = Client('inproc://test_client_zmq_async_pipeline', '12345')
+
+    async def server(s, n):
+        # collect every request before answering any, then reply in reverse order
+        reqs = [await s.recv_multipart() for _ in range(n)]
+        for client_id, id, null, token, mtype, data in reversed(reqs):
+            rv = {'status': 'success', 'data': [{'indicator': json.loads(data)['indicator']}]}
+            await s.send_multipart([client_id, id, null, mtype, json.dumps(rv).encode('utf-8')])
+
+    async def run():
+        s = cli.context.socket(zmq.ROUTER)
+        s.bind(cli.remote)
+        t = asyncio.ensure_future(server(s, 10))
+
+        rv = await asyncio.gather(*[cli.indicators_search({'indicator': 'example%i.com' % n}) for n in range(10)])
+        await t
+        s.close()
+        await cli.close()
+        return rv
+
+    rv = asyncio.run(run())
+    assert rv == [[{'indicator': 'example%i.com' % n}] for n in range(10)]
+
+
+def test_client_zmq_async_timeout():
+    cli = Client('inproc://test_client_zmq_async_timeout', '12345', timeout=100)
+
+    async def run():
+        s = cli.context.socket(zmq.ROUTER)
+        s.bind(cli.remote)
+
+        with pytest.raises(TimeoutError):
+            await cli.ping()
+
+        assert not cli._pending
+        s.close()
+        await cli.close()
+
+    asyncio.run(run())
+
+
+def test_client_zmq_async_circuit_open():
+    from cifsdk.client.breaker import CircuitBreaker
+    from cifsdk.exceptions import CircuitOpen
+
+    cli = Client('inproc://test_client_zmq_async_circuit_open', '12345',
+                 circuit_breaker=CircuitBreaker(threshold=1, reset_timeout=60))
+    cli.circuit_breaker.failure()
+
+    async def run():
+        for _ in range(5):
+            with pytest.raises(CircuitOpen):
+                await cli.ping()
+
+        assert not cli._pending
+        await cli.close()
+
+    asyncio.run(run())
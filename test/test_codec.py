@@ -0,0 +1,49 @@
+import py.test
+
+from cifsdk.utils import zcodec
+
+
+def test_codec_roundtrip():
+    data = b'{"indicator": "example.com", "tags": ["botnet"]}' * 1000
+
+    for codec in zcodec.available():
+        c = zcodec.compress(data, codec, level=9)
+        assert len(c) < len(data)
+
+        chunks = [c[i:i + 7] for i in range(0, len(c), 7)]
+        assert b''.join(zcodec.iter_decompress(chunks, codec)) == data
+
+
+def test_codec_raw_deflate():
+    import zlib
+
+    data = b'example.com' * 100
+    c = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    c = c.compress(data) + c.flush()
+
+    d = zcodec.Decompressor('deflate')
+    assert d.decompress(c) + d.flush() == data
+    assert d.ratio > 1
+
+
+def test_codec_accept_encoding():
+    assert zcodec.accept_encoding('gzip,deflate') == 'gzip, deflate'
+
+    with py.test.raises(ValueError):
+        zcodec.accept_encoding('lzma')
+
+
+def test_codec_http_gzip():
+    import json
+    from test.test_client_http import _response
+    from cifsdk.client.http import HTTP
+
+    data = [{'indicator': '192.168.1.%i' % n, 'itype': 'ipv4'} for n in range(100)]
+    body = zcodec.compress(json.dumps({'status': 'success', 'data': data}).encode('utf-8'), 'gzip')
+
+    cli = HTTP('https://localhost:3000', '12345', accept_encoding='gzip', compression='gzip')
+    assert cli.session.headers['Accept-Encoding'] == 'gzip'
+
+    cli.session.get = lambda *args, **kwargs: _response(body, headers={'Content-Encoding': 'gzip'})
+    assert list(cli.feed_iter({'itype': 'ipv4'})) == data
+    assert cli.feed({'itype': 'ipv4'}) == data
@@ -0,0 +1,69 @@
+import gzip
+import json
+import random
+
+from cifsdk.feed.diff import write_snapshot, iter_snapshot, diff, diff_feed
+
+
+def _feed(n, **kwargs):
+    return [dict({'indicator': '192.0.2.%i' % i, 'provider': 'a.com', 'tags': ['scanner', 'ssh'],
+                  'confidence': 8, 'reporttime': '2019-01-01T00:00:00Z'}, **kwargs) for i in range(n)]
+
+
+def test_feed_snapshot(tmpdir):
+    data = _feed(100)
+    random.seed(1)
+    random.shuffle(data)
+    data.append(dict(data[0]))
+
+    p = str(tmpdir.join('feed.snapshot'))
+    assert write_snapshot(data, p, chunk_size=7) == 100
+
+    keys = [k for k, _, _ in iter_snapshot(p)]
+    assert keys == sorted(keys)
+
+    with gzip.open(p, 'rt') as f:
+        assert len(f.readlines()) == 100
+
+    assert list(iter_snapshot(str(tmpdir.join('nope')))) == []
+
+    # duplicates keep the first occurrence, across runs too
+    dups = [{'indicator': 'example.com', 'confidence': c} for c in [7, 4, 9, 1, 5]]
+    for chunk_size in [2, 100]:
+        write_snapshot(dups, p, chunk_size=chunk_size)
+        assert [json.loads(d)['confidence'] for _, _, d in iter_snapshot(p)] == [7]
+
+    # only the snapshot should be left behind
+    assert tmpdir.listdir() == [tmpdir.join('feed.snapshot')]
+
+
+def test_feed_diff(tmpdir):
+    p = str(tmpdir.join('feed.snapshot'))
+
+    old = _feed(10)
+    rv = list(diff_feed(old, p))
+    assert len(rv) == 10
+    assert set(a for a, _ in rv) == {'added'}
+
+    new = _feed(10, reporttime='2019-01-02T00:00:00Z')[2:]
+    new[0]['confidence'] = 9
+    new[1]['tags'] = ['ssh', 'scanner']
+    new.append({'indicator': '192.0.2.1', 'provider': 'b.com', 'confidence': 7})
+
+    rv = list(diff_feed(new, p, update=False))
+    assert sorted((a, i['indicator'], i.get('provider')) for a, i in rv) == [
+        ('added', '192.0.2.1', 'b.com'),
+        ('changed', '192.0.2.2', 'a.com'),
+        ('removed', '192.0.2.0', 'a.com'),
+        ('removed', '192.0.2.1', 'a.com'),
+    ]
+
+    # not updated, same diff again
+    assert len(list(diff_feed(new, p))) == 4
+    assert list(diff_feed(new, p)) == []
+
+    assert len(tmpdir.listdir()) == 1
+
+    q = str(tmpdir.join('other.snapshot'))
+    write_snapshot(old, q)
+    assert len(list(diff(q, p))) == 4
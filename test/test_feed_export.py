@@ -0,0 +1,83 @@
+import json
+import py.test
+
+from cifsdk.feed.export import write_parquet, write_arrow_ipc, write_ndjson
+
+
+def _feed(n):
+    for i in range(n):
+        yield {'indicator': '192.0.2.%i' % (i % 256), 'itype': 'ipv4', 'provider': 'a.com', 'confidence': 8,
+               'tags': ['scanner', 'ssh'] if i % 2 else 'scanner', 'group': 'everyone', 'count': i,
+               'reporttime': '2019-01-01T00:00:00Z', 'rdata': ['a', 'b'] if i == 0 else None}
+
+
+def test_feed_export_parquet(tmpdir):
+    pyarrow = py.test.importorskip('pyarrow')
+    import pyarrow.parquet
+
+    p = str(tmpdir.join('feed.parquet'))
+    assert write_parquet(_feed(1000), p, batch_size=300) == 1000
+
+    f = pyarrow.parquet.ParquetFile(p)
+    assert f.metadata.num_row_groups == 4
+
+    t = f.read()
+    assert t.num_rows == 1000
+    r = t.slice(0, 2).to_pylist()
+    assert r[0]['tags'] == ['scanner']
+    assert r[1]['tags'] == ['scanner', 'ssh']
+    assert r[0]['group'] == ['everyone']
+    assert r[0]['rdata'] == 'a,b'
+    assert r[0]['reporttime'].year == 2019
+    assert r[1]['description'] is None
+
+
+def test_feed_export_arrow_ipc(tmpdir):
+    pyarrow = py.test.importorskip('pyarrow')
+    import pyarrow.ipc
+
+    p = str(tmpdir.join('feed.arrow'))
+    with open(p, 'wb') as f:
+        assert write_arrow_ipc(_feed(10), f, batch_size=4) == 10
+
+    with pyarrow.ipc.open_stream(p) as r:
+        t = r.read_all()
+
+    assert t.num_rows == 10
+    assert t.column('count').to_pylist() == list(range(10))
+
+
+def test_feed_export_ndjson(tmpdir):
+    class _File(object):
+        def __init__(self):
+            self.writes = []
+            self.flushes = 0
+
+        def write(self, s):
+            self.writes.append(s)
+
+        def flush(self):
+            self.flushes += 1
+
+    f = _File()
+    assert write_ndjson(_feed(10), f, flush_every=3) == 10
+    assert len(f.writes) == 4
+    assert f.flushes == 4
+
+    rv = [json.loads(l) for l in ''.join(f.writes).splitlines()]
+    assert rv == list(_feed(10))
+
+    f = _File()
+    write_ndjson(_feed(100), f, buffer_size=1024)
+    assert 1 < len(f.writes) < 100
+
+    # the http client hands back 'message' as bytes
+    f = _File()
+    write_ndjson([{'indicator': 'example.com', 'message': b'hello'}, {'indicator': 'example.org', 'message': b'\xff'}], f)
+    assert [json.loads(l)['message'] for l in ''.join(f.writes).splitlines()] == ['hello', '/w==']
+
+    p = str(tmpdir.join('feed.json'))
+    assert write_ndjson(iter([]), p) == 0
+    assert write_ndjson(_feed(5), p) == 5
+    with open(p) as f:
+        assert len(f.readlines()) == 5
@@ -0,0 +1,65 @@
+import py.test
+
+from cifsdk.feed import table
+from cifsdk.feed.table import FeedTable
+
+
+def _feed():
+    return [
+        {'indicator': '192.0.2.%i' % n, 'itype': 'ipv4', 'provider': 'a.com', 'confidence': n % 10,
+         'tags': ['scanner', 'ssh'] if n % 2 else ['scanner'], 'tlp': 'green',
+         'reporttime': '2019-01-%02iT00:00:00Z' % (n % 28 + 1), 'description': 'dropped'} for n in range(100)
+    ] + [
+        {'indicator': 'example.com', 'itype': 'fqdn', 'provider': 'b.com', 'confidence': 9, 'tags': 'phishing',
+         'reporttime': '2019-02-01T00:00:00Z', 'firsttime': '2019-01-01T00:00:00Z'},
+    ]
+
+
+def test_feed_table():
+    t = FeedTable.from_indicators(_feed())
+    assert len(t) == 101
+
+    assert t[0] == {'indicator': '192.0.2.0', 'itype': 'ipv4', 'provider': 'a.com', 'confidence': 0.0,
+                    'tags': ['scanner'], 'tlp': 'green', 'reporttime': '2019-01-01T00:00:00Z', 'firsttime': None,
+                    'lasttime': None}
+
+    assert t[-1]['tags'] == ['phishing']
+    assert t[-1]['firsttime'] == '2019-01-01T00:00:00Z'
+
+    with py.test.raises(IndexError):
+        t[101]
+
+    assert t.column('indicator')[:2] == ['192.0.2.0', '192.0.2.1']
+    assert t.column('itype')[-1] == 'fqdn'
+
+    assert t.nbytes < 100 * len(t)
+
+
+def _check_filters(t):
+    assert [i['indicator'] for i in t.filter(itype='fqdn')] == ['example.com']
+    assert len(t.filter(confidence=9)) == 11
+    assert len(t.filter(tags='ssh')) == 50
+    assert len(t.filter(tags=['ssh', 'phishing'])) == 51
+    assert len(t.filter(tags='nope')) == 0
+    assert len(t.filter(provider='a.com', since='2019-01-27T00:00:00Z')) == 6
+    assert len(t.filter(until='2019-01-01T00:00:00Z')) == 4
+
+    f = t.filter(itype=['ipv4', 'fqdn'], confidence=9)
+    assert len(f) == 11
+    f = f.filter(tags='ssh')
+    assert len(f) == 10
+    assert f.column('confidence') == [9.0] * 10
+    assert all('ssh' in i['tags'] for i in f)
+
+    with py.test.raises(RuntimeError):
+        f.append({'indicator': 'example.org'})
+
+
+def test_feed_table_filter(monkeypatch):
+    monkeypatch.setattr(table, 'np', None)
+    _check_filters(FeedTable.from_indicators(_feed()))
+
+
+def test_feed_table_filter_numpy():
+    py.test.importorskip('numpy')
+    _check_filters(FeedTable.from_indicators(_feed()))
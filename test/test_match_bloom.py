@@ -0,0 +1,36 @@
+import py.test
+
+from cifsdk.match.bloom import BloomFilter
+
+
+def test_match_bloom(tmpdir):
+    data = [{'indicator': '192.0.2.%i' % i} for i in range(256)] + [{'indicator': 'Example.COM'}]
+
+    b = BloomFilter.from_indicators(data, error_rate=0.01)
+    assert len(b) == 257
+    assert all(d['indicator'] in b for d in data)
+    assert 'example.com' in b
+
+    fp = sum(b.contains_many('198.51.100.%i.x' % i for i in range(10000)))
+    assert fp < 300
+
+    p = str(tmpdir.join('feed.bloom'))
+    b.save(p)
+    b2 = BloomFilter.load(p)
+    assert (b2.bits, b2.hashes, len(b2)) == (b.bits, b.hashes, len(b))
+    assert b2.contains_many(['192.0.2.1', 'example.com']) == [True, True]
+
+    with py.test.raises(ValueError):
+        BloomFilter.from_bytes(b'nope')
+
+    with py.test.raises(ValueError):
+        BloomFilter.from_bytes(b.to_bytes()[:-1])
+
+    with py.test.raises(ValueError):
+        BloomFilter(10, error_rate=2)
+
+
+def test_match_bloom_update():
+    b = BloomFilter(10)
+    assert b.update([{'indicator': '192.0.2.1'}, 'Example.COM']) == 2
+    assert b.contains_many(['192.0.2.1', 'example.com', '192.0.2.2']) == [True, True, False]
@@ -0,0 +1,70 @@
+from cifsdk.match.domain import DomainMatcher, URLMatcher
+
+
+def test_match_domain(tmpdir):
+    m = DomainMatcher([
+        {'indicator': 'evil.com', 'provider': 'a.com'},
+        {'indicator': 'evil.com', 'provider': 'b.com'},
+        {'indicator': 'x.bad.org.', 'provider': 'a.com'},
+        {'indicator': 'a.x.bad.org', 'provider': 'c.com'},
+    ])
+
+    assert len(m) == 3
+    assert [r['provider'] for r in m.match('evil.com')] == ['a.com', 'b.com']
+    assert m.match('a.b.EVIL.com')[0]['indicator'] == 'evil.com'
+    assert m.match('notevil.com') is None
+    assert m.match('com') is None
+    assert m.match('bad.org') is None
+    assert m.match('a..evil.com') is None
+    assert m.match('.evil.com') is None
+    assert m.match('') is None
+    assert m.match_many(['a..b.evil.com', 'a.evil.com.'])[1][0]['indicator'] == 'evil.com'
+    assert m.match('y.x.bad.org')[0]['indicator'] == 'x.bad.org.'
+    assert m.match('b.a.x.bad.org')[0]['provider'] == 'c.com'
+
+    assert [r and r[0]['provider'] for r in m.match_many(['www.evil.com', 'example.com'])] == ['a.com', None]
+
+    p = str(tmpdir.join('fqdn.json.gz'))
+    m.save(p)
+    m = DomainMatcher.load(p)
+    assert 'www.evil.com' in m
+    assert 'example.com' not in m
+
+
+def test_match_url(tmpdir):
+    m = URLMatcher([
+        {'indicator': 'http://evil.com/malware.exe', 'provider': 'a.com'},
+        {'indicator': 'evil.com/mal', 'provider': 'b.com'},
+        {'indicator': 'https://bad.org/login.php', 'provider': 'a.com'},
+        {'indicator': 'ware', 'provider': 'c.com'},
+    ])
+
+    rv = m.match('1.2.3.4 - - "GET https://EVIL.com/malware.exe?x=1 HTTP/1.1" 200')
+    assert sorted(r['provider'] for r in rv) == ['a.com', 'b.com', 'c.com']
+
+    assert m.match('https://bad.org/login.php')[0]['provider'] == 'a.com'
+    assert m.match('https://bad.org/logout.php') is None
+
+    assert [bool(r) for r in m.match_many(['evil.com/ma', 'evil.com/mal'])] == [False, True]
+
+    p = str(tmpdir.join('url.json.gz'))
+    m.save(p)
+    m = URLMatcher.load(p)
+    assert 'http://bad.org/login.php' in m
+    assert 'http://bad.org/' not in m
+
+    m.add('bad.org/')
+    assert 'http://bad.org/' in m
+
+
+def test_match_save_bytes(tmpdir):
+    # records straight from HTTP.feed() carry the message as bytes
+    m = DomainMatcher([{'indicator': 'evil.com', 'message': b'hi'}])
+    p = str(tmpdir.join('fqdn.json.gz'))
+    m.save(p)
+    assert DomainMatcher.load(p).match('evil.com')[0]['message'] == 'hi'
+
+    m = URLMatcher([{'indicator': 'evil.com/mal', 'message': b'hi'}])
+    p = str(tmpdir.join('url.json.gz'))
+    m.save(p)
+    assert URLMatcher.load(p).match('http://evil.com/malware')[0]['message'] == 'hi'
@@ -0,0 +1,66 @@
+import ipaddress
+import random
+
+from cifsdk.match.ip import IPMatcher
+
+
+def test_match_ip():
+    m = IPMatcher([
+        {'indicator': '192.0.2.0/24', 'provider': 'a.com'},
+        {'indicator': '192.0.2.128/25', 'provider': 'a.com'},
+        {'indicator': '192.0.2.128/25', 'provider': 'b.com'},
+        {'indicator': '192.0.2.1', 'provider': 'c.com'},
+        {'indicator': '10.0.0.0/8', 'provider': 'a.com'},
+        {'indicator': '2001:db8::/32', 'provider': 'a.com'},
+        {'indicator': '2001:db8:1::1', 'provider': 'b.com'},
+        {'indicator': 'example.com'},
+    ])
+
+    assert len(m) == 6
+
+    assert m.match('192.0.2.1')[0]['provider'] == 'c.com'
+    assert m.match('192.0.2.2')[0]['indicator'] == '192.0.2.0/24'
+    assert [r['provider'] for r in m.match('192.0.2.200')] == ['a.com', 'b.com']
+    assert m.match('192.0.3.1') is None
+    assert m.match('10.255.1.1')[0]['indicator'] == '10.0.0.0/8'
+    assert m.match('11.0.0.1') is None
+    assert m.match('garbage') is None
+
+    # cidr queries only match prefixes that contain the whole range
+    assert m.match('192.0.2.128/26')[0]['indicator'] == '192.0.2.128/25'
+    assert m.match('192.0.0.0/16') is None
+
+    assert [r['indicator'] for r in m.match_all('192.0.2.1')] == ['192.0.2.0/24', '192.0.2.1']
+
+    assert m.match('2001:db8:1::1')[0]['provider'] == 'b.com'
+    assert m.match('2001:db8:ffff::1')[0]['indicator'] == '2001:db8::/32'
+    assert m.match('2001:db9::1') is None
+
+    rv = m.match_many(['192.0.2.1', '8.8.8.8', '2001:db8::1', int(ipaddress.ip_address('10.1.2.3'))])
+    assert [r and r[0]['indicator'] for r in rv] == ['192.0.2.1', None, '2001:db8::/32', '10.0.0.0/8']
+
+    assert '10.1.1.1' in m
+    assert '11.1.1.1' not in m
+
+
+def test_match_ip_random():
+    random.seed(1)
+    nets = set()
+    for _ in range(2000):
+        plen = random.randint(8, 32)
+        nets.add(ipaddress.ip_network((random.getrandbits(32), plen), strict=False))
+
+    m = IPMatcher(str(n) for n in nets)
+
+    for _ in range(2000):
+        a = ipaddress.ip_address(random.getrandbits(32))
+        if random.random() < 0.5:
+            a = random.choice(list(nets)).network_address
+
+        expected = [n for n in nets if a in n]
+        expected = str(max(expected, key=lambda n: n.prefixlen)) if expected else None
+
+        rv = m.match(str(a))
+        assert (rv and rv[0]) == expected
+
+    assert len(m.trees[4]) <= 2 * len(nets) + 1
@@ -0,0 +1,116 @@
+import arrow
+import py.test
+
+from cifsdk.store import Store
+
+
+class _Client(object):
+    def __init__(self, data):
+        self.data = data
+        self.filters = []
+
+    def feed_iter(self, filters):
+        self.filters.append(dict(filters))
+        return iter(self.data)
+
+
+def _ts(secs_ago):
+    return arrow.get(arrow.utcnow().int_timestamp - secs_ago).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def test_store_sync(tmpdir):
+    c = _Client([
+        {'indicator': '192.0.2.1', 'itype': 'ipv4', 'provider': 'a.com', 'confidence': 8, 'tags': ['scanner'],
+         'reporttime': _ts(3600)},
+        {'indicator': '192.0.2.1', 'itype': 'ipv4', 'provider': 'b.com', 'confidence': 4, 'tags': 'scanner,ssh',
+         'reporttime': _ts(1800)},
+        {'indicator': 'example.com', 'itype': 'fqdn', 'provider': 'a.com', 'confidence': 9, 'tags': ['phishing'],
+         'reporttime': _ts(600)},
+    ])
+
+    s = Store(str(tmpdir.join('store.sqlite')), client=c)
+    assert s.sync({'itype': 'ipv4', 'confidence': 4}, start=_ts(7200)) == 3
+    assert len(s) == 3
+    assert c.filters[0]['reporttime'].startswith(_ts(7200))
+
+    assert len(s.search({'indicator': '192.0.2.1'})) == 2
+    assert len(s.search({'indicator': '192.0.2.1', 'confidence': 5})) == 1
+    assert s.search({'tags': 'ssh'})[0]['provider'] == 'b.com'
+    assert len(s.search({'tags': ['ssh', 'phishing']})) == 2
+    assert s.search({'itype': 'fqdn'})[0]['indicator'] == 'example.com'
+    assert len(s.search({'reporttime': _ts(2000)})) == 2
+    assert len(s.search({'limit': 1})) == 1
+
+    # second sync picks up where the first left off
+    hwm = s.hwm({'confidence': 4, 'itype': 'ipv4'})
+    assert hwm >= arrow.utcnow().int_timestamp - 600
+
+    # nothing new to ask for yet
+    assert s.sync({'itype': 'ipv4', 'confidence': 4}) == 0
+    assert len(c.filters) == 1
+
+    hwm -= 300
+    s.handle.execute('UPDATE feeds SET hwm = ?', (hwm,))
+
+    c.data = [{'indicator': '192.0.2.1', 'itype': 'ipv4', 'provider': 'a.com', 'confidence': 2, 'tags': ['old'],
+               'reporttime': _ts(5000)}]
+    s.sync({'itype': 'ipv4', 'confidence': 4})
+    assert c.filters[1]['reporttime'].startswith(arrow.get(hwm + 1).strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+    # older reports don't clobber newer ones
+    assert s.search({'indicator': '192.0.2.1', 'provider': 'a.com'})[0]['confidence'] == 8
+    assert s.search({'tags': 'old'}) == []
+    s.close()
+
+    with Store(str(tmpdir.join('store.sqlite'))) as s:
+        assert len(s) == 3
+        with py.test.raises(RuntimeError):
+            s.sync({'itype': 'ipv4'})
+
+
+def test_store_sync_limit(tmpdir):
+    now = arrow.utcnow().int_timestamp
+
+    class _Paging(object):
+        def __init__(self, data):
+            self.data = data
+            self.filters = []
+
+        def feed_iter(self, filters):
+            self.filters.append(dict(filters))
+            start, end = [arrow.get(t).int_timestamp for t in filters['reporttime'].split(',')]
+            rv = [i for i in self.data if start <= arrow.get(i['reporttime']).int_timestamp <= end]
+            rv.sort(key=lambda i: i['reporttime'])
+            return iter(rv[:int(filters['limit'])])
+
+    # pairs of rows share a reporttime, so pages end part way through a second
+    data = [{'indicator': '192.0.2.%i' % n, 'itype': 'ipv4', 'reporttime': _ts(3000 - (n // 2) * 60)}
+            for n in range(25)]
+    c = _Paging(data)
+
+    s = Store(str(tmpdir.join('store.sqlite')), client=c)
+    s.sync({'itype': 'ipv4'}, start=_ts(3600), limit=5)
+
+    assert len(s) == 25
+    assert all(f['limit'] == 5 and f['sort'] == 'reporttime' for f in c.filters)
+    assert len(c.filters) > 5
+    assert s.hwm({'itype': 'ipv4'}) >= now - 600
+
+    # a page that can't move forward gives up without losing its place
+    c = _Paging([{'indicator': '192.0.2.%i' % n, 'reporttime': _ts(3000)} for n in range(10)])
+    s = Store(str(tmpdir.join('store2.sqlite')), client=c)
+    s.sync({'itype': 'ipv4'}, start=_ts(3000), limit=5)
+    assert len(c.filters) == 1
+    assert s.hwm({'itype': 'ipv4'}) == arrow.get(_ts(3000)).int_timestamp - 1
+
+
+def test_store_upsert_bytes(tmpdir):
+    # HTTP.feed() hands back the message field as bytes
+    s = Store(str(tmpdir.join('store.sqlite')))
+    n, _ = s.upsert([{'indicator': 'example.com', 'itype': 'fqdn', 'reporttime': _ts(60), 'message': b'hi'},
+                     {'indicator': 'example.net', 'itype': 'fqdn', 'reporttime': _ts(60), 'message': b'\xff'}])
+
+    assert n == 2
+    rv = {i['indicator']: i['message'] for i in s.search({'itype': 'fqdn'})}
+    assert rv['example.com'] == 'hi'
+    assert rv['example.net'] == '/w=='
@@ -17,3 +17,43 @@ def test_timestamps():
         x = parse_timestamp(t)
         print(t, x)
         assert x == ts[t]
+
+
+def test_timestamps_fast():
+    from cifsdk.utils.zarrow import _fast, _parse_timestamp, parse_timestamps
+    import py.test
+
+    ts = ['2015-01-01', '2015-01-01T23:59:59Z', '2015-01-01 23:59:59', '2015-01-01T23:59:59.123456Z',
+          '2015-01-01T23:59:59.5Z', '2015-01-01T23:59:59+00:00', '1367900664', '20160401', '20130601235959']
+
+    for t in ts:
+        assert _fast(t) is not None
+        assert _fast(t) == _parse_timestamp(t)
+
+    # unusual input goes through arrow
+    for t in ['2014-01-01T23:59+04:00', '2015-13-01', 'yesterday', '201604']:
+        assert _fast(t) is None
+
+    assert parse_timestamps(ts + ['2014-01-01T23:59+04:00']) == \
+        [_parse_timestamp(t) for t in ts] + [arrow.get('2014-01-01T23:59:00+04:00')]
+
+    with py.test.raises(RuntimeError):
+        parse_timestamp('1970-01-01T00:00:00Z')
+
+    with py.test.raises(RuntimeError):
+        parse_timestamp('yesterday')
+
+
+def test_timestamps_cached():
+    from cifsdk.utils.zarrow import cached_parser, timestamp_cache_stats
+
+    p = cached_parser(maxsize=2)
+    for _ in range(3):
+        for t in ['2015-01-01T23:59:59Z', '20160401']:
+            assert p(t) == parse_timestamp(t)
+
+    assert timestamp_cache_stats(p) == {'hits': 4, 'misses': 2, 'size': 2, 'maxsize': 2}
+
+    p('1367900664')
+    p('2015-01-01T23:59:59Z')
+    assert timestamp_cache_stats(p)['misses'] == 4